@@ -1,49 +1,116 @@
 # app/blueprints/blog.py
 from datetime import date, datetime
-from flask import Blueprint, render_template, redirect, url_for, request, flash, abort
+from typing import Optional
+import click
+from flask import Blueprint, render_template, redirect, url_for, request, flash, abort, jsonify, current_app
 from flask_login import login_required, current_user
-from sqlalchemy import func, or_
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import noload
+from ..cache import SWRCache
 from ..extensions import db
 from ..models import Articulos, Comentarios, Tag, Role
 from ..forms import PostForm
 from ..utils import generar_slug, _parse_fecha, parse_tags, tag_slug
 from ..security import roles_required
+from ..pagination import keyset_paginate
+from ..projections import cards, card_query, to_cards
+from ..context import invalidate_ultimos_articulos
+from ..search import (search_articulos, index_articulo, remove_articulo, articulo_guardado, articulo_borrado,
+                      rebuild as rebuild_search)
+from .. import search_memory
+from ..suggest import suggest_index, TAG
+from .main import invalidate_main_tag
 
 bp = Blueprint("blog", __name__)
 
-# --- Listado con filtros y paginación ---
+PER_PAGE = 12
+# Totales de /articulos por (búsqueda, tag). Por worker; los CRUD la vacían en el suyo
+_totales = SWRCache(fresh_secs=120, stale_secs=900, max_entries=256)
+
+
+def _articulos_cambiados() -> None:
+    """Cachés por worker que dependen de la lista de artículos (llamar tras commit)."""
+    invalidate_ultimos_articulos()
+    invalidate_main_tag()  # el post puede haber creado el tag "main"
+    _totales.invalidate()
+
+# --- Listado con filtros y paginación por cursor (fecha, id) ---
 @bp.get("/articulos", endpoint="articulos_todos")
 def articulos_todos():
-    page = request.args.get("page", 1, type=int)
     qtxt = (request.args.get("q") or "").strip()
     tag_param = (request.args.get("tag") or "").strip()   # usarás slug o nombre normalizado (ver abajo)
 
+    # admitimos que 'tag' venga como nombre humano o como slug
+    tag_slug_val = tag_slug(tag_param) if tag_param else None  # reutilizamos util existente
+
+    # --- Índice en memoria (SEARCH_BACKEND=memory): ranking BM25 y paginación por cursor ---
+    if qtxt and search_memory.enabled():
+        cursor = request.args.get("cursor") or None
+        ids, next_cursor, total = search_memory.memory_index.search(
+            qtxt, limit=PER_PAGE, cursor=cursor, tag_slug=tag_slug_val)
+        by_id = {a.id: a for a in cards(Articulos.query.filter(Articulos.id.in_(ids)))} if ids else {}
+        return _render_articulos(
+            articulos=[by_id[i] for i in ids if i in by_id],
+            total=total, qtxt=qtxt, tag_sel=tag_param,
+            next_url=(url_for("blog.articulos_todos", q=qtxt, tag=tag_param or None, cursor=next_cursor)
+                      if next_cursor else None),
+            first_url=url_for("blog.articulos_todos", q=qtxt, tag=tag_param or None) if cursor else None,
+        )
+
     q = Articulos.query
 
-    # --- Búsqueda de texto: incluye título, descripción, contenido y nombres de tags ---
+    # --- Filtro por tag: coincide tanto si es principal como secundario ---
+    if tag_slug_val:
+        q = q.filter(Articulos.tags.any(func.lower(Tag.slug) == func.lower(tag_slug_val)))
+
+    # --- Búsqueda de texto (título, descripción, contenido y tags), por relevancia ---
     if qtxt:
-        like = f"%{qtxt}%"
-        q = (q.outerjoin(Articulos.tags)
-               .filter(or_(
-                   Articulos.titulo.ilike(like),
-                   Articulos.descripcion.ilike(like),
-                   Articulos.contenido.ilike(like),
-                   Tag.nombre.ilike(like),
-               ))
-               .distinct())
+        q, keys = search_articulos(q, qtxt)
+    else:
+        keys = [Articulos.fecha, Articulos.id]
+    # Sólo las columnas de las tarjetas (+ rank si hay ranking), nunca el contenido
+    q = card_query(q, *keys[:-2])
 
-    # --- Filtro por tag: coincide tanto si es principal como secundario ---
-    if tag_param:
-        # admitimos que 'tag' venga como nombre humano o como slug
-        tag_slug_val = tag_slug(tag_param)  # reutilizamos util existente
-        q = (q.join(Articulos.tags)
-               .filter(func.lower(Tag.slug) == func.lower(tag_slug_val))
-               .distinct())
+    token = request.args.get("after") or request.args.get("before")
+    page = keyset_paginate(q, keys, PER_PAGE, token)
+    articulos = to_cards(page.items)
+
+    def _url(**kw):
+        return url_for("blog.articulos_todos", q=qtxt or None, tag=tag_param or None, **kw)
+
+    return _render_articulos(
+        articulos=articulos,
+        total=_total(q, qtxt, tag_slug_val),
+        qtxt=qtxt,
+        tag_sel=tag_param,
+        next_url=_url(after=page.next_token) if page.has_next else None,
+        prev_url=_url(before=page.prev_token) if page.has_prev else None,
+        first_url=_url() if token else None,
+    )
 
-    q = q.order_by(Articulos.fecha.desc())
-    pagination = db.paginate(q, page=page, per_page=12, error_out=False)
+def _total(q, qtxt: str, tag_slug_val) -> Optional[int]:
+    """Total de resultados, cacheado por filtro. None si ARTICULOS_CONTAR_TOTAL está desactivado."""
+    if not current_app.config.get("ARTICULOS_CONTAR_TOTAL", True):
+        return None
+    return _totales.get((qtxt.lower(), tag_slug_val), lambda: q.order_by(None).count())
 
+# --- Autocompletado del buscador (sin BD: app/suggest.py) ---
+@bp.get("/articulos/suggest", endpoint="articulos_suggest")
+def articulos_suggest():
+    qtxt = (request.args.get("q") or "").strip()
+    limit = max(1, min(request.args.get("n", 8, type=int), 20))
+    items = [{
+        "tipo": kind,
+        "texto": texto,
+        "url": (url_for("blog.articulos_todos", tag=slug) if kind == TAG
+                else url_for("blog.detalle_articulo", slug=slug)),
+    } for kind, slug, texto in suggest_index.lookup(qtxt, limit)]
+    resp = jsonify({"q": qtxt, "items": items})
+    resp.headers["Cache-Control"] = "public, max-age=60"
+    return resp
+
+def _render_articulos(**ctx):
     # --- Construir el desplegable de categorías principales ---
     PRINCIPALES = ["Opinión", "Renovables","Combustibles","Sistema Eléctrico","Movilidad","Sostenibilidad","Actualidad","Sociedad y Energía"]
 
@@ -56,15 +123,7 @@ def articulos_todos():
     # Mantén orden definido por tu lista PRINCIPALES
     tags_main = [n for n in PRINCIPALES if n in nombres_existentes]
 
-    return render_template(
-        "articulos.html",
-        articulos=pagination.items,
-        pagination=pagination,
-        total=pagination.total,
-        qtxt=qtxt,
-        tag_sel=tag_param,
-        tags_main=tags_main,
-    )
+    return render_template("articulos.html", tags_main=tags_main, **ctx)
 
 # --- Detalle + publicar comentario (requiere login) ---
 @bp.route("/articulos/<slug>", methods=["GET", "POST"], endpoint="detalle_articulo")
@@ -134,7 +193,12 @@ def make_new_post():
         )
         nuevo.tags = [_get_or_create_tag(n) for n in nombres]
         db.session.add(nuevo)
+        db.session.flush()
+        index_articulo(nuevo)
         db.session.commit()
+        _articulos_cambiados()
+        articulo_guardado(nuevo)
+        suggest_index.articulo_guardado(nuevo)
         return redirect(url_for('blog.detalle_articulo', slug=nuevo.slug))
     return render_template('make-post.html', form=form)
 
@@ -152,6 +216,7 @@ def editar_articulo(slug):
         contenido   = post.contenido,
     )
     if form.validate_on_submit():
+        old_slug = post.slug
         if form.titulo.data != post.titulo:
             post.slug = generar_slug(form.titulo.data)
 
@@ -166,7 +231,11 @@ def editar_articulo(slug):
         post.contenido = form.contenido.data
         post.tags      = [_get_or_create_tag(n) for n in nombres]
 
+        index_articulo(post)
         db.session.commit()
+        _articulos_cambiados()
+        articulo_guardado(post)
+        suggest_index.articulo_guardado(post, old_slug=old_slug)
         return redirect(url_for("blog.detalle_articulo", slug=post.slug))
     return render_template("make-post.html", form=form, is_edit=True)
 
@@ -174,18 +243,23 @@ def editar_articulo(slug):
 @roles_required(Role.admin)
 def delete_post(slug):
     post = Articulos.query.filter_by(slug=slug).first_or_404()
+    post_id = post.id
+    remove_articulo(post_id)
     db.session.delete(post)
     db.session.commit()
+    _articulos_cambiados()
+    articulo_borrado(post_id)
+    suggest_index.articulo_borrado(slug)
     return redirect(url_for('blog.articulos_todos'))
 
 # --- Listar por tag ---
 @bp.get("/tags/<tag_slug>", endpoint="articulos_por_tag")
 def articulos_por_tag(tag_slug):
-    tag = Tag.query.filter_by(slug=tag_slug).first_or_404()
-    posts = (Articulos.query.join(Articulos.tags)
-             .filter(Tag.id == tag.id)
-             .order_by(Articulos.id.desc())
-             .all())
+    # Sólo la fila del tag: Tag.articulos (selectin) cargaría todos sus artículos con contenido
+    tag = Tag.query.options(noload(Tag.articulos)).filter_by(slug=tag_slug).first_or_404()
+    posts = cards(Articulos.query.join(Articulos.tags)
+                  .filter(Tag.id == tag.id)
+                  .order_by(Articulos.id.desc()))
     return render_template("articulos_por_tag.html", tag=tag, articulos=posts)
 
 # --- Buscar por múltiples tags ---
@@ -197,9 +271,24 @@ def buscar_por_tags():
     slugs = [tag_slug(n) for n in nombres]
     modo = request.args.get("modo", "or").lower()
 
-    q = Articulos.query.join(Articulos.tags).filter(Tag.slug.in_(slugs))
     if modo == "and":
-        q = q.group_by(Articulos.id).having(func.count(func.distinct(Tag.id)) == len(slugs))
+        q = (Articulos.query.join(Articulos.tags).filter(Tag.slug.in_(slugs))
+             .group_by(Articulos.id).having(func.count(func.distinct(Tag.id)) == len(slugs)))
+    else:
+        # EXISTS: una fila por artículo aunque coincidan varios tags
+        q = Articulos.query.filter(Articulos.tags.any(Tag.slug.in_(slugs)))
 
-    posts = q.order_by(Articulos.id.desc()).all()
+    posts = cards(q.order_by(Articulos.id.desc()))
     return render_template("buscar_por_tags.html", tags=nombres, articulos=posts, modo=modo)
+
+
+@bp.cli.command("reindex")
+def reindex_cmd():
+    """Reconstruye el índice de búsqueda de artículos (FTS5 en SQLite y/o índice en memoria)."""
+    if search_memory.enabled():
+        click.echo(f"Índice en memoria: {search_memory.memory_index.rebuild()} artículos")
+    n = rebuild_search()
+    if n or db.engine.dialect.name == "sqlite":
+        click.echo(f"{n} artículos indexados")
+    else:
+        click.echo("PostgreSQL: search_vector es una columna generada, no hace falta reindexar")
@@ -1,28 +1,134 @@
 # app/blueprints/main.py
-from flask import Blueprint, render_template
-from sqlalchemy import func
+from typing import List, Optional, Tuple
+from flask import Blueprint, render_template, request, jsonify, url_for, current_app
+from sqlalchemy import func, or_
+from sqlalchemy.orm import defer
+from ..cache import SWRCache
+from ..extensions import db
 from ..models import Articulos, Tag
+from ..projections import ArticuloCard, cards
 
 bp = Blueprint("main", __name__)
 
-@bp.get("/", endpoint="home")
-def home():
-    main_tag = Tag.query.filter((Tag.slug == "main") | (Tag.nombre.ilike("main"))).first()
-    if main_tag:
-        destacado = (Articulos.query.join(Articulos.tags)
-                     .filter(Tag.id == main_tag.id)
-                     .order_by(Articulos.id.desc()).first())
+# Tarjetas de "Últimos artículos" en la portada y tamaño de cada "Cargar más"
+HOME_OTROS = 2
+MAS_PER_PAGE = 6
+MAS_MAX_PER_PAGE = 24
+
+# Id del tag "main" (0 si no existe). Por worker; la invalida blog._articulos_cambiados()
+# tras cada commit que puede crear o renombrar tags
+_main_tag_cache = SWRCache(fresh_secs=300, stale_secs=3600, max_entries=1)
+
+
+def _load_main_tag_id() -> int:
+    row = (db.session.query(Tag.id)
+           .filter((Tag.slug == "main") | (Tag.nombre.ilike("main")))
+           .first())
+    return row[0] if row else 0
+
+def main_tag_id() -> Optional[int]:
+    return _main_tag_cache.get("main", _load_main_tag_id) or None
+
+def invalidate_main_tag() -> None:
+    """Llamar tras crear o renombrar tags."""
+    _main_tag_cache.invalidate()
+
+
+def _destacado() -> Optional[Articulos]:
+    tag_id = main_tag_id()
+    if tag_id:
+        q = Articulos.query.join(Articulos.tags).filter(Tag.id == tag_id)
     else:
-        destacado = (Articulos.query
-                     .filter(Articulos.tag.ilike("main"))
-                     .order_by(Articulos.id.desc()).first())
+        q = Articulos.query.filter(Articulos.tag.ilike("main"))
+    destacado = q.order_by(Articulos.id.desc()).first()
+    if destacado is None:
+        destacado = Articulos.query.order_by(Articulos.id.desc()).first()
+    return destacado
+
+def _pagina_otros(before_id: Optional[int], exclude_id: Optional[int],
+                  limit: int) -> Tuple[List[ArticuloCard], Optional[int]]:
+    """
+    Página de artículos por id descendente, anteriores a `before_id` (cursor).
+    Pide limit+1 filas para saber si hay más sin contar. Devuelve
+    (tarjetas, cursor siguiente o None).
+    """
+    q = Articulos.query
+    if before_id is not None:
+        q = q.filter(Articulos.id < before_id)
+    if exclude_id is not None:
+        q = q.filter(Articulos.id != exclude_id)
+    rows = cards(q.order_by(Articulos.id.desc()).limit(limit + 1))
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return rows, rows[-1].id
+    return rows, None
+
+
+def _columna(destacado: Optional[Articulos]):
+    """
+    columna(nombre) para opinion_card: la última columna de opinión del
+    autor (o, si no tiene, su último artículo). Consulta con LIMIT 1 en lugar
+    de recorrer todo el archivo en la plantilla.
+    """
+    def _es_opinion(a: Articulos) -> bool:
+        tags_str = ",".join([t.nombre for t in a.tags] + [t.slug for t in a.tags]).lower()
+        return ("opinion" in tags_str or "opinión" in tags_str
+                or bool(a.tag and "opin" in a.tag.lower()))
 
-    ultimos = Articulos.query.order_by(Articulos.id.desc()).all()
-    if destacado is None and ultimos:
-        destacado = ultimos[0]
-    otros = [a for a in ultimos if not destacado or a.id != destacado.id]
+    def columna(nombre: str) -> Optional[Articulos]:
+        nombre_norm = nombre.lower().replace(" ", "").strip()
+        if not nombre_norm:
+            return None
+        autor_norm = func.replace(func.lower(Articulos.autor), " ", "")
+        if destacado is not None and nombre_norm in destacado.autor.lower().replace(" ", "") \
+                and _es_opinion(destacado):
+            return destacado
+        # contenido diferido: sólo se lee si la columna no tiene descripción
+        por_autor = (Articulos.query.options(defer(Articulos.contenido))
+                     .filter(autor_norm.contains(nombre_norm, autoescape=True)))
+        opinion = (por_autor
+                   .filter(or_(Articulos.tags.any(or_(Tag.slug.ilike("%opinion%"),
+                                                      Tag.nombre.ilike("%opinion%"),
+                                                      Tag.nombre.ilike("%opinión%"))),
+                               Articulos.tag.ilike("%opin%")))
+                   .order_by(Articulos.id.desc()).first())
+        if opinion is not None:
+            return opinion
+        if destacado is not None and nombre_norm in destacado.autor.lower().replace(" ", ""):
+            return destacado
+        return por_autor.order_by(Articulos.id.desc()).first()
+    return columna
+
+
+@bp.get("/", endpoint="home")
+def home():
+    destacado = _destacado()
+    otros, next_cursor = _pagina_otros(None, destacado.id if destacado else None, HOME_OTROS)
+    return render_template("index.html", destacado=destacado, otros=otros,
+                           otros_cursor=next_cursor, columna=_columna(destacado))
 
-    return render_template("index.html", destacado=destacado, otros=otros)
+@bp.get("/api/articulos/recientes", endpoint="articulos_recientes")
+def articulos_recientes():
+    """Siguiente página de "Últimos artículos" (botón "Cargar más" de la portada)."""
+    cursor = request.args.get("cursor", type=int)
+    exclude = request.args.get("excluir", type=int)
+    per_page = max(1, min(request.args.get("n", MAS_PER_PAGE, type=int), MAS_MAX_PER_PAGE))
+    rows, next_cursor = _pagina_otros(cursor, exclude, per_page)
+    tag_color = current_app.jinja_env.filters["tag_color"]
+    return jsonify({
+        "items": [{
+            "titulo": a.titulo,
+            "slug": a.slug,
+            "url": url_for("blog.detalle_articulo", slug=a.slug),
+            "descripcion": a.descripcion,
+            "img_url": a.img_url,
+            "fecha": a.fecha.isoformat() if a.fecha else None,
+            "autor": a.autor,
+            "tag": a.tag_principal,
+            "tag_color": tag_color(a.tag_principal),
+        } for a in rows],
+        "next_cursor": next_cursor,
+    })
 
 @bp.get("/sobre-nosotros", endpoint="sobre_nosotros")
 def sobre_nosotros():
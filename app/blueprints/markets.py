@@ -1,62 +1,63 @@
 # app/blueprints/markets.py
 
-from datetime import datetime, timezone, date
-from flask import Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify
+import hashlib
+import hmac
+import click
+from datetime import datetime, timezone
+from flask import (Blueprint, render_template, request, redirect, url_for, flash, abort, jsonify,
+                   current_app, stream_with_context)
 from flask_login import current_user, login_required
-from app.extensions import db
-from app.models import SiteNote, Role  # SiteNote(key, content, updated_at, author_id) y Role.admin
-from app.markets import td_price_batch, td_timeseries_daily  # ← usa tus funciones EIA
+from app.extensions import db, csrf
+from app.models import SiteNote, Role, User  # SiteNote(key, content, updated_at, author_id) y Role.admin
+from app.cache import SWRCache
+from app.markets_store import (keys_from_query, dashboard_body, markets_status, refresh_markets, backfill_markets,
+                               norm_range,
+                               BACKFILL_CHUNK_DAYS,
+                               DASHBOARD_FRESH_SECS, DASHBOARD_STALE_SECS,
+                               downsampled_series, iter_series, series_version, RESAMPLES)
+from app.markets_history import parse_points
+from app.markets_registry import registry
+from app.markets_snapshot import snapshots, SNAPSHOT_POINTS
+from app.markets_live import live, sse_stream
 
 bp = Blueprint("markets", __name__)
 
-# Contenido inicial si la nota aún no existe (para que no salga vacío)
+# Contenido inicial si la nota aún no existe (la migración 07cafa46b5ff siembra la fila)
 _INITIAL_CONTENT = (
     "Sin comentario aún. (Usa el botón “Nuevo comentario mercados” para publicar el primero.)"
 )
 
-def _ensure_singleton_note():
-    """
-    Garantiza que exista la fila única key='markets'.
-    Si no existe, la crea con contenido inicial y fecha actual.
-    Devuelve la instancia de SiteNote.
-    """
-    note = SiteNote.query.get("markets")
-    if note is None:
-        note = SiteNote(
-            key="markets",
-            content=_INITIAL_CONTENT,
-            updated_at=datetime.now(timezone.utc),
-            author_id=(current_user.id if getattr(current_user, "is_authenticated", False) else None),
-        )
-        db.session.add(note)
-        db.session.commit()
-    return note
+# Nota de mercados en memoria: /mercados no toca la BD. El guardado invalida la
+# caché de su worker; el resto la ven en <= 60 s (fresca) + una respuesta rancia.
+_note_cache = SWRCache(fresh_secs=60, stale_secs=3600, max_entries=1)
+
+def _load_note() -> dict:
+    """{content, date, author} de la fila key='markets' (sólo lectura, sin objetos ORM)."""
+    row = (db.session.query(SiteNote.content, SiteNote.updated_at, User.nombre)
+           .outerjoin(User, SiteNote.author_id == User.id)
+           .filter(SiteNote.key == "markets")
+           .first())
+    if row is None:
+        return {"content": _INITIAL_CONTENT, "date": None, "author": None}
+    content, updated_at, author = row
+    return {
+        "content": content or "",
+        "date": updated_at.strftime("%d/%m/%Y") if updated_at else None,
+        "author": author,
+    }
 
 @bp.get("/mercados")
 def mercados_home():
-    note = _ensure_singleton_note()
-    date_str = note.updated_at.strftime("%d/%m/%Y") if note.updated_at else None
+    note = _note_cache.get("markets", _load_note)
     return render_template(
         "mercados.html",
-        markets_note=note.content or "",
-        markets_note_date=date_str,
+        markets_series=list(registry().values()),
+        chart_points=SNAPSHOT_POINTS,
+        markets_note=note["content"],
+        markets_note_date=note["date"],
+        markets_note_author=note["author"],
     )
 
-def _pct_change(last, base):
-    try:
-        if last is None or base is None or float(base) == 0:
-            return None
-        return (float(last) - float(base)) / float(base) * 100.0
-    except Exception:
-        return None
-
-def _extract_vals(ts_json):
-    """Devuelve (dates_desc, closes_desc) tal como vienen del helper (orden descendente)."""
-    vals = (ts_json or {}).get("values") or []
-    dates = [str(v.get("datetime", ""))[:10] for v in vals if v.get("datetime")]
-    closes = [v.get("close") for v in vals]
-    return dates, closes
-
 # ← Este endpoint es el que necesita tu plantilla: {{ url_for('markets.mercados_json') }}
 @bp.get("/mercados/dashboard.json", endpoint="mercados_json")
 def mercados_json():
@@ -65,97 +66,212 @@ def mercados_json():
     {
       "markets": [
         {
-          "id": "brent" | "wti",
+          "id": "brent" | "wti" | "henry_hub" | ... (claves de Config.MERCADOS_SERIES),
+          "label": "Brent",
+          "frequency": "daily",
           "value": 67.8,
           "unit": "USD/bbl",
           "chg_10d_pct": -1.23,
           "chg_30d_pct": 2.34,
           "stale": false,
           "last_date": "YYYY-MM-DD",
+          "range": null | "1M" | "6M" | "1Y" | "5Y",
+          "indicators": {...},
           "spark_dates": ["YYYY-MM-DD", ...] (asc),
           "spark": [..precios..] (asc)
         },
         ...
       ]
     }
+    ?range=1M|6M|1Y|5Y cambia el tramo del sparkline (por defecto, 32 observaciones);
+    ?points=N lo reduce con LTTB a N puntos como máximo (250 por defecto con rango).
+    Sólo lee de la BD / histórico en memoria; la EIA se consulta en el refresh.
+    Sin ?s=, el cuerpo es el snapshot que escribe el refresh (br/zstd/gzip según
+    Accept-Encoding); si no lo hay, sale de una caché stale-while-revalidate por
+    worker. Siempre con ETag fuerte/304.
     """
-    # Permitimos pasar alias por query; por defecto mostramos Brent/WTI
-    syms_csv = request.args.get("s", "RBRTE,RWTC")
-
-    # 1) Precios puntuales (strings en el helper) y series (30 puntos recientes)
-    prices = td_price_batch(syms_csv)
-    series_map = {}
-    for raw in [s.strip() for s in syms_csv.split(",") if s.strip()]:
-        series_map[raw] = td_timeseries_daily(raw, outputsize=32)
-
-    # 2) Función para construir cada tarjeta (brent/wti)
-    def _mk_market(id_key: str, price_key: str):
-        # Precio puntual -> float
-        p_obj = (prices.get(price_key) or {})
-        p_val = p_obj.get("price")
-        try:
-            value = float(p_val) if p_val is not None else None
-        except Exception:
-            value = None
-
-        # Serie descendente (más reciente primero)
-        ts = series_map.get(price_key) or {}
-        dates_desc, closes_desc = _extract_vals(ts)
-
-        # Para spark, el front quiere ASCENDENTE
-        spark_dates = list(reversed(dates_desc))
-        spark = [float(x) if x is not None else None for x in reversed(closes_desc)]
-
-        # Último dato (si hay)
-        last_date = dates_desc[0] if dates_desc else None
-        last_close = float(closes_desc[0]) if closes_desc and closes_desc[0] is not None else None
-
-        # Cambios % a ~10 y ~30 observaciones atrás (si existen)
-        base10 = float(closes_desc[10]) if len(closes_desc) > 10 and closes_desc[10] is not None else None
-        base30 = float(closes_desc[30]) if len(closes_desc) > 30 and closes_desc[30] is not None else None
-        chg10 = _pct_change(last_close, base10)
-        chg30 = _pct_change(last_close, base30)
-
-        # Staleness: si el último dato es de hace >10 días
-        stale = False
-        if last_date:
-            try:
-                y, m, d = [int(x) for x in last_date.split("-")]
-                delta_days = (date.today() - date(y, m, d)).days
-                stale = delta_days > 10
-            except Exception:
-                stale = False
-
-        return {
-            "id": id_key,
-            "value": value,
-            "unit": "USD/bbl",
-            "chg_10d_pct": chg10,
-            "chg_30d_pct": chg30,
-            "stale": stale,
-            "last_date": last_date,
-            "spark_dates": spark_dates,
-            "spark": spark,
-        }
-
-    # 3) Mapear claves de entrada a tarjetas esperadas por el front
-    def _find_key(*candidates):
-        for c in candidates:
-            if c in prices:
-                return c
-        # si nada coincide, devuelve el primero (el front manejará None)
-        return candidates[0]
-
-    key_brent = _find_key("BRENT", "RBRTE")
-    key_wti   = _find_key("WTI", "RWTC")
-
-    payload = {
-        "markets": [
-            _mk_market("brent", key_brent),
-            _mk_market("wti", key_wti),
-        ]
-    }
-    return jsonify(payload)
+    range_code = norm_range(request.args.get("range"))
+    points = parse_points(request.args.get("points"))
+    # Sin ?s= (todas las series) servimos el snapshot precomprimido del último refresh
+    snap = None if request.args.get("s") else snapshots.get(range_code, points)
+    if snap is not None:
+        encoding = snap.negotiate(request.accept_encodings)
+        body, etag = snap.bodies[encoding], snap.etag(encoding)
+    else:
+        # Permitimos pasar alias por query; por defecto mostramos todos los configurados
+        keys = keys_from_query(request.args.get("s"))
+        encoding = "identity"
+        body, etag = dashboard_body(keys, range_code, points)
+
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+    else:
+        resp = current_app.response_class(body, mimetype="application/json")
+        if encoding != "identity":
+            resp.headers["Content-Encoding"] = encoding
+    resp.set_etag(etag)
+    resp.vary.add("Accept-Encoding")
+    resp.headers["Cache-Control"] = (
+        f"public, max-age={DASHBOARD_FRESH_SECS}, stale-while-revalidate={DASHBOARD_STALE_SECS}"
+    )
+    return resp
+
+@bp.get("/mercados/stream", endpoint="mercados_stream")
+def mercados_stream():
+    """
+    Server-Sent Events: `event: markets` con {"markets": [{"id","value","stale","asof"}, ...]}
+    sólo cuando un refresh cambia MercadoUltimo (delta de las series que cambiaron).
+    El front lo usa para recargar el dashboard en vez de sondearlo.
+    """
+    resp = current_app.response_class(
+        sse_stream(current_app._get_current_object(), request.headers.get("Last-Event-ID") or None),
+        mimetype="text/event-stream",
+    )
+    resp.headers["Cache-Control"] = "no-cache"
+    resp.headers["X-Accel-Buffering"] = "no"  # que el proxy no acumule eventos
+    return resp
+
+def _parse_date_arg(name: str):
+    raw = (request.args.get(name) or "").strip()
+    if not raw:
+        return None
+    try:
+        return datetime.strptime(raw, "%Y-%m-%d").date().isoformat()
+    except ValueError:
+        abort(400, description=f"'{name}' debe ser YYYY-MM-DD")
+
+@bp.get("/mercados/series", endpoint="mercados_series")
+def mercados_series():
+    """
+    Serie histórica de un símbolo desde MercadoDaily:
+      ?symbol=brent|wti|RBRTE|...  &from=YYYY-MM-DD  &to=YYYY-MM-DD
+      &resample=daily|weekly|monthly  &format=json|csv  &points=N
+    JSON: {"symbol", "resample", "from", "to", "points": [{"date","close","high","low"}, ...]}
+    Con points (sólo JSON diario) la serie se reduce con LTTB: [{"date","close"}, ...].
+    CSV: se genera fila a fila (streaming) para exportaciones largas.
+    Soporta GET condicional (ETag / If-None-Match).
+    """
+    raw_symbol = (request.args.get("symbol") or "").strip()
+    if not raw_symbol:
+        abort(400, description="falta 'symbol'")
+    keys = keys_from_query(raw_symbol)
+    if len(keys) > 1:
+        abort(400, description="'symbol' debe indicar una sola serie")
+    if not keys:
+        abort(404)
+    key = keys[0]
+    start, end = _parse_date_arg("from"), _parse_date_arg("to")
+    resample = (request.args.get("resample") or "daily").lower()
+    if resample not in RESAMPLES:
+        abort(400, description="resample debe ser daily, weekly o monthly")
+    fmt = (request.args.get("format") or "").lower()
+    if not fmt:
+        fmt = "csv" if request.accept_mimetypes.best == "text/csv" else "json"
+    points = parse_points(request.args.get("points")) if fmt == "json" and resample == "daily" else None
+
+    n, last, digest = series_version(key, start, end)
+    etag = hashlib.sha1(f"{key}|{start}|{end}|{resample}|{fmt}|{points}|{n}|{last}|{digest}".encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        resp = current_app.response_class(status=304)
+        resp.set_etag(etag)
+        return resp
+
+    rows = iter_series(key, start, end, resample)
+    if points is not None:
+        resp = jsonify({
+            "symbol": key,
+            "resample": resample,
+            "from": start,
+            "to": end,
+            "points": [{"date": d, "close": c} for d, c in downsampled_series(key, start, end, points)],
+        })
+    elif fmt == "csv":
+        def _csv():
+            yield "date,close,high,low\n"
+            for d, close, high, low in rows:
+                yield f"{d},{close},{high},{low}\n"
+        resp = current_app.response_class(stream_with_context(_csv()), mimetype="text/csv")
+        resp.headers["Content-Disposition"] = f'attachment; filename="{key}_{resample}.csv"'
+    else:
+        resp = jsonify({
+            "symbol": key,
+            "resample": resample,
+            "from": start,
+            "to": end,
+            "points": [{"date": d, "close": c, "high": h, "low": l} for d, c, h, l in rows],
+        })
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    return resp
+
+def _check_refresh_token():
+    """El workflow de GitHub manda CANAL_KEY en X-Refresh-Token."""
+    expected = current_app.config.get("CANAL_KEY") or ""
+    given = request.headers.get("X-Refresh-Token") or ""
+    if not expected or not hmac.compare_digest(given, expected):
+        abort(403)
+
+# Lo llama .github/workflows/refresh_mercados.yml cada 12 h
+@bp.post("/tasks/refresh-mercados", endpoint="refresh_mercados")
+@csrf.exempt
+def refresh_mercados():
+    _check_refresh_token()
+    report = refresh_markets()
+    live.poke()
+    current_app.logger.info(
+        "Refresh mercados: ok=%s %.0f ms fallos=%d",
+        report["ok"], report["elapsed_ms"], len(report["failures"]),
+    )
+    # 502 sólo si no se pudo actualizar ninguna serie
+    all_failed = bool(report["series"]) and len(report["failures"]) == len(report["series"])
+    return jsonify(report), (502 if all_failed else 200)
+
+# Monitorización: estado del circuit breaker (por worker) y frescura de cada serie
+@bp.get("/tasks/mercados-status", endpoint="mercados_status")
+def mercados_status():
+    _check_refresh_token()
+    return jsonify(markets_status())
+
+# Refresco manual: `flask markets refresh`
+@bp.cli.command("refresh")
+def refresh_command():
+    """Descarga de la EIA y actualiza las tablas de mercados."""
+    report = refresh_markets()
+    for item in report["series"]:
+        if "error" in item:
+            print(f"{item['id']}: ERROR {item['error']} ({item['elapsed_ms']} ms)")
+        else:
+            print(f"{item['id']}: {item['rows']} filas, {item['inserted']} nuevas ({item['elapsed_ms']} ms)")
+    print(f"Total: {report['elapsed_ms']} ms")
+
+# Carga histórica: `flask markets backfill --since 1987-05-20 --symbols brent,wti`
+@bp.cli.command("backfill")
+@click.option("--since", required=True, type=click.DateTime(formats=["%Y-%m-%d"]), help="Primera fecha (YYYY-MM-DD).")
+@click.option("--until", type=click.DateTime(formats=["%Y-%m-%d"]), default=None, help="Última fecha (por defecto, hoy).")
+@click.option("--symbols", default=None, help="Claves o series separadas por comas (por defecto, todas).")
+@click.option("--chunk-days", default=BACKFILL_CHUNK_DAYS, show_default=True, help="Días por petición a la EIA.")
+@click.option("--restart", is_flag=True, help="Ignora el progreso guardado de una ejecución interrumpida.")
+def backfill_command(since, until, symbols, chunk_days, restart):
+    """Descarga la historia diaria de la EIA a MercadoDaily (reanudable)."""
+    keys = keys_from_query(symbols)
+    if not keys:
+        raise click.BadParameter("ningún símbolo configurado coincide", param_hint="--symbols")
+
+    def _progress(p):
+        secs = p["elapsed_ms"] / 1000
+        rate = p["rows"] / secs if secs else 0
+        click.echo(f"  {p['done']}/{p['chunks']} tramos, {p['rows']} filas ({rate:.0f} filas/s)")
+
+    report = backfill_markets(keys, since.date(), until.date() if until else None,
+                              chunk_days=chunk_days, resume=not restart, on_wave=_progress)
+    if report["skipped"]:
+        click.echo(f"Reanudado: {report['skipped']} tramos ya estaban guardados")
+    for f in report["failed"]:
+        click.echo(f"Tramo {f['start']}..{f['end']}: ERROR {f['error']}")
+    click.echo(f"{', '.join(keys)}: {report['rows']} filas, {report['inserted']} nuevas "
+               f"en {report['elapsed_ms'] / 1000:.1f} s ({report['rows_per_s']} filas/s)")
+    if report["failed"]:
+        raise SystemExit("Backfill incompleto: vuelve a lanzarlo para reintentar los tramos fallidos")
 
 # IMPORTANTÍSIMO: endpoint="update_markets_note" para que coincida con url_for('markets.update_markets_note')
 @bp.route("/admin/markets-note", methods=["POST"], endpoint="update_markets_note")
@@ -181,5 +297,6 @@ def update_markets_note():
     note.updated_at = datetime.now(timezone.utc)
 
     db.session.commit()
+    _note_cache.invalidate("markets")
     flash("Comentario de mercados actualizado.", "success")
     return redirect(url_for("markets.mercados_home"))
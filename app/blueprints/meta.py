@@ -51,7 +51,12 @@ def news_sitemap():
     now = datetime.utcnow()
     cutoff = now - timedelta(days=2)
 
-    posts = Articulos.query.order_by(Articulos.id.desc()).all()
+    # Sólo lo que lleva el sitemap y sólo los recientes (no el archivo entero con su contenido)
+    cols = (Articulos.slug, Articulos.titulo, Articulos.fecha)
+    posts = (db.session.query(*cols)
+             .filter(Articulos.fecha >= cutoff.date())
+             .order_by(Articulos.id.desc())
+             .all())
     items = []
     for p in posts:
         d = p.fecha
@@ -73,8 +78,9 @@ def news_sitemap():
                 "title": p.titulo
             })
 
-    if not items and posts:
-        p = posts[0]
+    latest = None if items else db.session.query(*cols).order_by(Articulos.id.desc()).first()
+    if latest:
+        p = latest
         dd = _parse_fecha(p.fecha) if p.fecha else now.date()
         dt = datetime(dd.year, dd.month, dd.day, 12, 0, 0)
         items.append({"loc": url_for("blog.detalle_articulo", slug=p.slug, _external=True), "date": dt, "title": p.titulo})
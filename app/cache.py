@@ -0,0 +1,70 @@
+# app/cache.py
+"""
+Caché en proceso con stale-while-revalidate y single-flight.
+
+Cada worker de gunicorn tiene la suya; la invalidación explícita sólo llega
+al worker que escribe, así que los TTL acotan cuánto puede tardar el resto.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class SWRCache:
+    """
+    - Entrada fresca (edad < fresh_secs): se devuelve tal cual.
+    - Entrada rancia (edad < stale_secs): la primera petición la recalcula
+      ("líder"); las demás reciben la versión rancia al instante.
+    - Sin entrada utilizable: una sola petición calcula y el resto espera
+      su resultado, en vez de repetir el trabajo.
+    """
+    def __init__(self, fresh_secs: float, stale_secs: float, max_entries: int = 128):
+        self.fresh_secs = fresh_secs
+        self.stale_secs = max(stale_secs, fresh_secs)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+        self._flights: Dict[Hashable, threading.Event] = {}
+
+    def get(self, key: Hashable, loader: Callable[[], Any], wait_secs: float = 30) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry[1] if entry else None
+            if entry and age < self.fresh_secs:
+                return entry[0]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = threading.Event()
+            elif entry and age < self.stale_secs:
+                return entry[0]
+
+        if leader:
+            try:
+                value = loader()
+                self.set(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._flights.pop(key, None)
+                flight.set()
+
+        flight.wait(wait_secs)
+        with self._lock:
+            entry = self._entries.get(key)
+        # Si el líder falló no hay entrada: lo intentamos nosotros
+        return entry[0] if entry else loader()
+
+    def set(self, key: Hashable, value: Any) -> None:
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))  # la más antigua
+            self._entries[key] = (value, time.monotonic())
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
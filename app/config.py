@@ -16,6 +16,20 @@ def _get_db_url():
     #     url = url.replace("postgresql://", "postgresql+psycopg://", 1)
     return url
 
+# Series EIA que sigue /mercados (en orden de tarjeta)
+_MERCADOS_SERIES = [
+    {"key": "brent", "series": "RBRTE", "route": "petroleum/pri/spt", "frequency": "daily",
+     "unit": "USD/bbl", "label": "Brent"},
+    {"key": "wti", "series": "RWTC", "route": "petroleum/pri/spt", "frequency": "daily",
+     "unit": "USD/bbl", "label": "WTI"},
+    {"key": "henry_hub", "series": "RNGWHHD", "route": "natural-gas/pri/fut", "frequency": "daily",
+     "unit": "USD/MMBtu", "label": "Henry Hub"},
+    {"key": "heating_oil", "series": "EER_EPD2F_PF4_Y35NY_DPG", "route": "petroleum/pri/spt",
+     "frequency": "daily", "unit": "USD/gal", "label": "Gasóleo calefacción (NY Harbor)"},
+    {"key": "gasoline", "series": "EER_EPMRU_PF4_Y35NY_DPG", "route": "petroleum/pri/spt",
+     "frequency": "daily", "unit": "USD/gal", "label": "Gasolina (NY Harbor)"},
+]
+
 class Config:
     WTF_CSRF_ENABLED = True
     # Seguridad / token para el endpoint de refresh
@@ -38,15 +52,33 @@ class Config:
     # EIA (US Energy Information Administration) - GRATIS
     # Añade EIA_API_KEY=... en tu .env
     EIA_API_KEY = os.getenv("EIA_API_KEY", "")
+    # Presupuesto total (s) de cada operación contra la EIA, reintentos incluidos.
+    # Debe quedar holgado dentro del --max-time 60 del workflow de refresh.
+    EIA_DEADLINE_SECS = float(os.getenv("EIA_DEADLINE_SECS", "30"))
+    # Raíz de la API (sin /v2). Vacío = https://api.eia.gov; para pruebas de carga
+    # sin red: EIA_API_ROOT=http://127.0.0.1:8765 con `python tools/eia_standin.py`.
+    EIA_API_ROOT = os.getenv("EIA_API_ROOT", "")
+
+    # === Series de "mercados" ===
+    # Registro que define ingesta y tarjetas de /mercados (ver app/markets_registry.py):
+    # clave, serie EIA, ruta v2, frecuencia (daily|weekly|monthly), unidad y etiqueta.
+    MERCADOS_SERIES = _MERCADOS_SERIES
+    # Compatibilidad: {clave: serie} derivado del registro
+    TWELVEDATA_SYMBOLS = {s["key"]: s["series"] for s in _MERCADOS_SERIES}
+
+    # Filas por símbolo que se conservan en MercadoDaily. Vacío = historia completa
+    # (necesaria para los rangos 1M/6M/1Y/5Y de /mercados).
+    MERCADOS_DAILY_RETENTION = int(os.getenv("MERCADOS_DAILY_RETENTION") or 0) or None
+    # Carpeta de los snapshots comprimidos del dashboard (app/markets_snapshot.py).
+    # Vacío = instance/mercados
+    MERCADOS_SNAPSHOT_DIR = os.getenv("MERCADOS_SNAPSHOT_DIR", "")
 
-    # === Símbolos de "mercados" ===
-    # Para "disfrazar" la EIA sin tocar rutas/plantillas:
-    # usamos los códigos diarios de la EIA (series "RBRTE" y "RWTC").
-    # Tu markets.py adaptado a EIA tomará estos como símbolos.
-    TWELVEDATA_SYMBOLS = {
-        "brent": "RBRTE",  # Brent (PET.RBRTE.D)
-        "wti":   "RWTC",   # WTI  (PET.RWTC.D)
-    }
+    # === Búsqueda de /articulos ===
+    # Vacío = FTS de la BD (tsvector en PostgreSQL, FTS5 en SQLite; ver app/search.py).
+    # "memory" = índice BM25 en memoria persistido en instance/search (app/search_memory.py).
+    SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "")
+    # "Mostrando N de TOTAL": el COUNT se cachea por filtro; 0 lo desactiva
+    ARTICULOS_CONTAR_TOTAL = os.getenv("ARTICULOS_CONTAR_TOTAL", "1") != "0"
 
     ADMIN_EMAILS = [e.strip().lower() for e in os.getenv("ADMIN_EMAILS", "").split(",") if e.strip()]
 
@@ -1,6 +1,65 @@
 # app/context.py
+from dataclasses import dataclass
+from datetime import date
+from typing import Callable, List, Optional
+from .cache import SWRCache
+from .extensions import db
 from .models import Articulos
 
+# "Publicaciones Recientes" de base.html
+ULTIMOS_N = 3
+# Por worker; los CRUD del blog la invalidan en el suyo y el resto caduca en 5 min
+_ultimos_cache = SWRCache(fresh_secs=300, stale_secs=3600, max_entries=1)
+
+
+@dataclass(frozen=True)
+class ArticuloReciente:
+    titulo: str
+    slug: str
+    img_url: Optional[str]
+    fecha: date
+    autor: str
+
+
+def _load_ultimos() -> List[ArticuloReciente]:
+    """Los ULTIMOS_N artículos más recientes (por id), sólo las columnas del sidebar."""
+    rows = (db.session.query(Articulos.titulo, Articulos.slug, Articulos.img_url,
+                             Articulos.fecha, Articulos.autor)
+            .order_by(Articulos.id.desc())
+            .limit(ULTIMOS_N)
+            .all())
+    return [ArticuloReciente(*row) for row in rows]
+
+def invalidate_ultimos_articulos() -> None:
+    """Llamar tras crear, editar o borrar un artículo."""
+    _ultimos_cache.invalidate()
+
+
+class _Lazy:
+    """Secuencia que sólo se carga si la plantilla la recorre (las páginas sin sidebar no consultan)."""
+    __slots__ = ("_loader", "_value")
+
+    def __init__(self, loader: Callable[[], list]):
+        self._loader = loader
+        self._value = None
+
+    def _get(self) -> list:
+        if self._value is None:
+            self._value = self._loader()
+        return self._value
+
+    def __iter__(self):
+        return iter(self._get())
+
+    def __len__(self):
+        return len(self._get())
+
+    def __getitem__(self, i):
+        return self._get()[i]
+
+    def __bool__(self):
+        return bool(self._get())
+
 def register_context(app):
     @app.context_processor
     def inject_datos_curiosos():
@@ -49,8 +108,8 @@ def register_context(app):
 
     @app.context_processor
     def inject_articulos():
-        articulos = Articulos.query.order_by(Articulos.id.asc()).all()
-        return dict(articulos=articulos)
+        # Perezoso y cacheado: coste constante aunque crezca el archivo
+        return dict(ultimos_articulos=_Lazy(lambda: _ultimos_cache.get("ultimos", _load_ultimos)))
 
 
     @app.context_processor
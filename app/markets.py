@@ -1,14 +1,26 @@
 # app/markets.py
 
-from typing import Dict, Any, List, Tuple, Optional
+from typing import Dict, Any, Callable, Iterable, List, Tuple, Optional, Union
+from concurrent.futures import ThreadPoolExecutor
+import datetime
 import json
 import os
+import threading
+import time
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 from flask import current_app
 
-EIA_BASE = "https://api.eia.gov/v2/petroleum/pri/spt/data/"
+EIA_API_ROOT = "https://api.eia.gov"
+EIA_ROUTE = "petroleum/pri/spt"
+EIA_BASE = f"{EIA_API_ROOT}/v2/{EIA_ROUTE}/data/"
+
+# La API v2 devuelve hasta 5000 filas por petición: una sola página cubre
+# cualquier refresh normal (antes se pedían bloques de 10).
+EIA_PAGE_SIZE = 5000
+# Series independientes se descargan en paralelo, todas sobre el mismo _session
+EIA_MAX_WORKERS = 4
 
 # ---- Alias comunes -> series EIA oficiales ----
 # RBRTE = Brent (Europe Brent Spot)
@@ -24,31 +36,178 @@ _SERIES_ALIASES = {
     "RWTC": "RWTC",
 }
 
-# ---------- Session con reintentos ----------
+# ---------- Session (los reintentos los gestiona _http_get con deadline) ----------
 def _make_session() -> requests.Session:
     s = requests.Session()
-    retry = Retry(
-        total=4,
-        connect=4,
-        read=4,
-        backoff_factor=1.0,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"],
-        raise_on_status=False,
-        respect_retry_after_header=True,
-    )
-    adapter = HTTPAdapter(max_retries=retry)
+    # Sin reintentos ocultos en urllib3: su backoff no respeta el deadline.
+    retry = Retry(total=0, raise_on_status=False)
+    # pool >= EIA_MAX_WORKERS para que los hilos reutilicen conexiones keep-alive
+    adapter = HTTPAdapter(max_retries=retry, pool_connections=4, pool_maxsize=EIA_MAX_WORKERS * 2)
     s.mount("https://", adapter)
     s.mount("http://", adapter)
     return s
 
 _session = _make_session()
 
-def _timeout():
-    # (connect, read) – margen generoso por lentitud eventual del endpoint
-    return (5, 60)
+# Reintentos por petición (además del primer intento), siempre dentro del deadline
+EIA_RETRIES = 3
+EIA_BACKOFF = 1.0  # 1 s, 2 s, 4 s...
+_RETRY_STATUS = {429, 500, 502, 503, 504}
+# Fallos de red que se reintentan (los HTTPError son los de _RETRY_STATUS)
+_TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout,
+                     requests.exceptions.ChunkedEncodingError, requests.HTTPError)
+
+class EIAUnavailable(Exception):
+    """La EIA no está disponible: deadline agotado o circuito abierto."""
+
+class Deadline:
+    """
+    Presupuesto de tiempo para una operación completa (todas las páginas,
+    reintentos y el fallback a querystring). Se comparte entre hilos.
+    """
+    def __init__(self, seconds: float):
+        self.seconds = float(seconds)
+        self.expires = time.monotonic() + self.seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0.0
+
+def _deadline_secs() -> float:
+    return float(current_app.config.get("EIA_DEADLINE_SECS", 30))
+
+def _timeout(deadline: Optional[Deadline] = None):
+    # (connect, read) – margen generoso por lentitud eventual del endpoint,
+    # recortado a lo que quede de deadline
+    if deadline is None:
+        return (5, 60)
+    left = deadline.remaining()
+    if left < 0.5:
+        raise EIAUnavailable("deadline agotado")
+    return (min(5.0, left), left)
+
+class CircuitBreaker:
+    """
+    Tras `failure_threshold` fallos seguidos deja de llamar a la EIA durante
+    `cooldown_secs` (estado "open"). Pasado ese tiempo deja pasar una llamada
+    de prueba ("half_open"): si va bien se cierra, si falla vuelve a abrirse.
+    El estado es por proceso (cada worker de gunicorn tiene el suyo).
+    """
+    def __init__(self, failure_threshold: int = 5, cooldown_secs: float = 600):
+        self.failure_threshold = failure_threshold
+        self.cooldown_secs = cooldown_secs
+        self._lock = threading.Lock()
+        self._state = "closed"
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trips = 0
+        self._last_error: Optional[str] = None
+        self._probe_in_flight = False
+
+    def before_call(self) -> None:
+        with self._lock:
+            if self._state == "open":
+                if time.monotonic() - (self._opened_at or 0) < self.cooldown_secs:
+                    raise EIAUnavailable("circuito EIA abierto")
+                self._state = "half_open"
+                self._probe_in_flight = False
+            if self._state == "half_open":
+                if self._probe_in_flight:
+                    raise EIAUnavailable("circuito EIA en prueba")
+                self._probe_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = "closed"
+            self._failures = 0
+            self._opened_at = None
+            self._probe_in_flight = False
+
+    def record_failure(self, error: str) -> None:
+        with self._lock:
+            self._failures += 1
+            self._last_error = error
+            self._probe_in_flight = False
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self._trips += 1
+                self._state = "open"
+                self._opened_at = time.monotonic()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            retry_in = None
+            if self._state == "open" and self._opened_at is not None:
+                retry_in = max(0.0, round(self.cooldown_secs - (time.monotonic() - self._opened_at), 1))
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "trips": self._trips,
+                "retry_in_secs": retry_in,
+                "last_error": self._last_error,
+            }
+
+eia_breaker = CircuitBreaker()
+
+def _http_get(params: Dict[str, Any], headers: Optional[Dict[str, str]] = None,
+              deadline: Optional[Deadline] = None, route: str = EIA_ROUTE) -> dict:
+    """
+    GET a _eia_base(route) con reintentos (EIA_RETRIES, backoff exponencial, Retry-After)
+    que nunca exceden el deadline, pasando por el circuit breaker.
+    Sólo se reintentan los errores transitorios (_RETRY_STATUS, conexión, timeout);
+    un 4xx permanente (clave o ruta mal) se lanza al primer intento.
+    Lanza EIAUnavailable o la excepción de requests del último intento.
+    """
+    eia_breaker.before_call()
+    attempt = 0
+    while True:
+        try:
+            resp = _session.get(_eia_base(route), params=params, headers=headers, timeout=_timeout(deadline))
+            if resp.status_code in _RETRY_STATUS:
+                raise requests.HTTPError(f"HTTP {resp.status_code}", response=resp)
+        except EIAUnavailable as e:
+            eia_breaker.record_failure(str(e))
+            raise
+        except _TRANSIENT_ERRORS as e:
+            attempt += 1
+            wait = EIA_BACKOFF * (2 ** (attempt - 1))
+            retry_after = getattr(getattr(e, "response", None), "headers", {}).get("Retry-After")
+            if retry_after and str(retry_after).isdigit():
+                wait = max(wait, float(retry_after))
+            left = deadline.remaining() if deadline is not None else float("inf")
+            if attempt > EIA_RETRIES or wait + 0.5 >= left:
+                eia_breaker.record_failure(str(e))
+                raise
+            time.sleep(wait)
+            continue
+        try:
+            resp.raise_for_status()
+            js = resp.json()
+        except requests.HTTPError as e:
+            if resp.status_code >= 500:
+                eia_breaker.record_failure(str(e))
+            else:
+                # 4xx: la EIA respondió; el error es nuestro y no abre el circuito
+                eia_breaker.record_success()
+            raise
+        except ValueError as e:  # cuerpo que no es JSON
+            eia_breaker.record_failure(str(e))
+            raise
+        eia_breaker.record_success()
+        return js
 
 # ---------- Utils ----------
+def _eia_base(route: str = EIA_ROUTE) -> str:
+    """
+    URL de datos de una ruta (p. ej. 'petroleum/pri/spt', 'natural-gas/pri/fut').
+    Config EIA_API_ROOT permite apuntar a otro servidor compatible
+    (p. ej. el sustituto offline de tools/eia_standin.py).
+    """
+    root = (current_app.config.get("EIA_API_ROOT") or EIA_API_ROOT).rstrip("/")
+    return f"{root}/v2/{route.strip('/')}/data/"
+
 def _eia_key() -> str:
     # lee de config o de entorno, prioridad config
     return (
@@ -76,27 +235,42 @@ def _norm_series_id(sym: str) -> str:
     # Aplica alias
     return _SERIES_ALIASES.get(s, s)
 
-def _req_xparams(series_key: str, length: int, offset: int = 0) -> Optional[dict]:
+def _as_series_list(series_key: Union[str, List[str]]) -> List[str]:
+    if isinstance(series_key, str):
+        return [series_key] if series_key else []
+    return [k for k in series_key if k]
+
+def _req_xparams(series_key: Union[str, List[str]], length: int, offset: int = 0,
+                 start: Optional[str] = None, deadline: Optional[Deadline] = None,
+                 end: Optional[str] = None, route: str = EIA_ROUTE,
+                 frequency: str = "daily") -> Optional[dict]:
     """
     Petición con header X-Params (recomendado por EIA) + paginación via offset.
+    `series_key` puede ser una serie o una lista (facets[series] admite varias).
+    `start` / `end` (YYYY-MM-DD, inclusivos) limitan el rango de periodos.
     """
     api_key = _eia_key()
     if not api_key or not series_key:
         return None
 
     xparams = {
-        "frequency": "daily",
+        "frequency": frequency,
         "data": ["value"],
-        "facets": {"series": [series_key]},
+        "facets": {"series": _as_series_list(series_key)},
         "sort": [{"column": "period", "direction": "desc"}],
         "offset": max(0, int(offset)),
         "length": max(1, int(length)),
     }
+    if start:
+        xparams["start"] = start
+    if end:
+        xparams["end"] = end
     headers = {"X-Params": json.dumps(xparams)}
     try:
-        resp = _session.get(EIA_BASE, params={"api_key": api_key}, headers=headers, timeout=_timeout())
-        resp.raise_for_status()
-        return resp.json()
+        return _http_get({"api_key": api_key}, headers=headers, deadline=deadline, route=route)
+    except EIAUnavailable as e:
+        current_app.logger.warning("EIA X-Params skipped series=%s: %s", series_key, e)
+        return None
     except Exception as e:
         current_app.logger.exception(
             "EIA X-Params request error series=%s len=%s off=%s: %s",
@@ -104,10 +278,13 @@ def _req_xparams(series_key: str, length: int, offset: int = 0) -> Optional[dict
         )
         return None
 
-def _req_querystring(series_key: str, length: int, offset: int = 0) -> Optional[dict]:
+def _req_querystring(series_key: Union[str, List[str]], length: int, offset: int = 0,
+                     start: Optional[str] = None, deadline: Optional[Deadline] = None,
+                     end: Optional[str] = None, route: str = EIA_ROUTE,
+                     frequency: str = "daily") -> Optional[dict]:
     """
     Plan B: mismos filtros en querystring (por si X-Params es filtrado o ignorado).
-    Incluye offset para paginación.
+    Incluye offset para paginación y `start` / `end` opcionales.
     """
     api_key = _eia_key()
     if not api_key or not series_key:
@@ -115,17 +292,22 @@ def _req_querystring(series_key: str, length: int, offset: int = 0) -> Optional[
     try:
         params = {
             "api_key": api_key,
-            "frequency": "daily",
+            "frequency": frequency,
             "data": "value",
             "length": max(1, int(length)),
             "offset": max(0, int(offset)),
             "sort[0][column]": "period",
             "sort[0][direction]": "desc",
-            "facets[series][]": series_key,
+            "facets[series][]": _as_series_list(series_key),  # requests lo repite por cada serie
         }
-        resp = _session.get(EIA_BASE, params=params, timeout=_timeout())
-        resp.raise_for_status()
-        return resp.json()
+        if start:
+            params["start"] = start
+        if end:
+            params["end"] = end
+        return _http_get(params, deadline=deadline, route=route)
+    except EIAUnavailable as e:
+        current_app.logger.warning("EIA querystring skipped series=%s: %s", series_key, e)
+        return None
     except Exception as e:
         current_app.logger.exception(
             "EIA querystring request error series=%s len=%s off=%s: %s",
@@ -138,6 +320,15 @@ def _extract_rows(js: Optional[dict]) -> List[dict]:
         return []
     return (js.get("response", {}) or {}).get("data", []) or []
 
+def _norm_period(p) -> str:
+    """Periodo EIA -> 'YYYY-MM-DD' ('2024-05' mensual -> '2024-05-01', '2024' anual -> '2024-01-01')."""
+    d = str(p or "")[:10]
+    if len(d) == 7:
+        return d + "-01"
+    if len(d) == 4:
+        return d + "-01-01"
+    return d
+
 # ---------- Lecturas de dato único / series ----------
 def _to_float_or_none(v) -> Optional[float]:
     try:
@@ -145,98 +336,245 @@ def _to_float_or_none(v) -> Optional[float]:
     except Exception:
         return None
 
-def _eia_get_latest_value(series_key: str) -> Optional[float]:
+def _eia_get_page(series_key: Union[str, List[str]], length: int, offset: int = 0,
+                  start: Optional[str] = None, deadline: Optional[Deadline] = None,
+                  end: Optional[str] = None, route: str = EIA_ROUTE,
+                  frequency: str = "daily") -> Optional[List[dict]]:
     """
-    Último valor (float) o None. Intenta X-Params y cae a querystring si falla/queda vacío.
+    Una página de filas. Cae a querystring sólo si X-Params *falla*;
+    una respuesta vacía es válida (p. ej. no hay datos desde `start`).
+    Devuelve None si ambas peticiones fallan.
     """
-    js = _req_xparams(series_key, length=1, offset=0)
-    rows = _extract_rows(js)
-    if not rows:
-        js = _req_querystring(series_key, length=1, offset=0)
-        rows = _extract_rows(js)
-        if not rows:
-            current_app.logger.warning(
-                "EIA empty latest for series=%s (after fallback). Raw=%s", series_key, js
-            )
-            return None
-    return _to_float_or_none(rows[0].get("value"))
+    kw = {"start": start, "deadline": deadline, "end": end, "route": route, "frequency": frequency}
+    js = _req_xparams(series_key, length=length, offset=offset, **kw)
+    if js is None:
+        js = _req_querystring(series_key, length=length, offset=offset, **kw)
+    if js is None:
+        return None
+    return _extract_rows(js)
 
-def _eia_get_last_n(series_key: str, n: int) -> List[Tuple[str, float]]:
+def _eia_get_batch(series_keys: List[str], n: int, start: Optional[str] = None,
+                   deadline: Optional[Deadline] = None, end: Optional[str] = None,
+                   route: str = EIA_ROUTE, frequency: str = "daily") -> Optional[Dict[str, List[Tuple[str, float]]]]:
     """
-    Descarga hasta n puntos recientes (desc) en bloques con paginación (offset).
+    Varias series en una sola petición (facets[series][] con todas) y
+    demultiplexadas por el campo `series` de cada fila:
+      ['RBRTE','RWTC'] -> {'RBRTE': [(fecha, valor), ...], 'RWTC': [...]}  (desc)
+    Hasta n puntos por serie. Sólo pagina si alguna serie se queda corta
+    (p. ej. festivos distintos). None si la primera petición falla.
+    Todas las páginas comparten el mismo deadline. `start`/`end` acotan fechas;
+    todas las series deben ser de la misma `route` y `frequency`.
     """
+    keys = list(dict.fromkeys(k for k in series_keys if k))
+    out: Dict[str, List[Tuple[str, float]]] = {k: [] for k in keys}
+    if not keys:
+        return out
     n = max(1, int(n))
-    out: List[Tuple[str, float]] = []
     offset = 0
+    if deadline is None:
+        deadline = Deadline(_deadline_secs())
 
-    while len(out) < n:
-        take = min(10, n - len(out))
-
-        js = _req_xparams(series_key, length=take, offset=offset)
-        rows = _extract_rows(js)
-        if not rows:
-            js = _req_querystring(series_key, length=take, offset=offset)
-            rows = _extract_rows(js)
-
-        if not rows:
+    while any(len(v) < n for v in out.values()):
+        take = min(EIA_PAGE_SIZE, n * len(keys))
+        rows = _eia_get_page(keys, length=take, offset=offset, start=start, deadline=deadline, end=end,
+                             route=route, frequency=frequency)
+        if rows is None:
             current_app.logger.warning(
-                "EIA empty chunk series=%s len=%s off=%s", series_key, take, offset
+                "EIA request failed series=%s len=%s off=%s", ",".join(keys), take, offset
             )
+            if offset == 0:
+                return None
             break
 
-        # Agregamos este bloque
         for r in rows:
-            d = str(r.get("period", ""))[:10]
+            skey = str(r.get("series") or (keys[0] if len(keys) == 1 else "")).upper()
+            d = _norm_period(r.get("period"))
             v = _to_float_or_none(r.get("value"))
-            if d and v is not None:
-                out.append((d, v))
+            if skey in out and d and v is not None and len(out[skey]) < n:
+                out[skey].append((d, v))
 
         if len(rows) < take:
             break
         offset += len(rows)
 
-    return out[:n]
+    return out
+
+def _eia_get_latest_value(series_key: str, deadline: Optional[Deadline] = None) -> Optional[float]:
+    """
+    Último valor (float) o None.
+    """
+    pairs = (_eia_get_batch([series_key], 1, deadline=deadline) or {}).get(series_key) or []
+    if not pairs:
+        current_app.logger.warning("EIA empty latest for series=%s", series_key)
+        return None
+    return pairs[0][1]
+
+def _eia_get_last_n(series_key: str, n: int, start: Optional[str] = None,
+                    deadline: Optional[Deadline] = None) -> List[Tuple[str, float]]:
+    """
+    Descarga hasta n puntos recientes (desc) en páginas de EIA_PAGE_SIZE:
+    para n <= 5000 es una única petición.
+    Con `start` sólo pide periodos >= start (sync incremental).
+    """
+    return (_eia_get_batch([series_key], n, start=start, deadline=deadline) or {}).get(series_key) or []
+
+def _run_parallel(fn: Callable[[Any], Any], items: Iterable[Any]) -> Dict[Any, Any]:
+    """
+    Ejecuta fn(item) en un pool acotado (EIA_MAX_WORKERS) con app context
+    en cada hilo. Devuelve {item: resultado}; las excepciones se propagan.
+    """
+    items = list(items)
+    if not items:
+        return {}
+    app = current_app._get_current_object()
+
+    def _call(item):
+        with app.app_context():
+            return fn(item)
+
+    with ThreadPoolExecutor(max_workers=min(EIA_MAX_WORKERS, len(items))) as ex:
+        return dict(zip(items, ex.map(_call, items)))
 
 # ---------- Interfaz compatible con tu app ----------
-def td_price_batch(symbols_csv: str) -> Dict[str, Any]:
+def td_price_batch(symbols_csv: str, deadline: Optional[Deadline] = None) -> Dict[str, Any]:
     """
     'RBRTE,RWTC' o 'BRENT,WTI' -> {"RBRTE":{"price":"xx.x"},"RWTC":{"price":"yy.y"}}
     Mantiene las claves originales de entrada para no romper llamadas existentes.
+    Todos los símbolos van en una única petición a la EIA.
     """
     out: Dict[str, Any] = {}
     if not symbols_csv:
         return out
 
-    for raw in [s.strip() for s in symbols_csv.split(",") if s.strip()]:
+    raws = [s.strip() for s in symbols_csv.split(",") if s.strip()]
+    batch = _eia_get_batch([_norm_series_id(raw) for raw in raws], 1, deadline=deadline) or {}
+    for raw in raws:
         skey = _norm_series_id(raw)
-        if not skey:
-            out[raw] = {"price": None}
-            continue
-        val = _eia_get_latest_value(skey)
+        pairs = batch.get(skey) or []
+        val = pairs[0][1] if pairs else None
         out[raw] = {"price": (str(val) if val is not None else None)}
         if val is None:
             current_app.logger.warning("No latest value for input=%s mapped_series=%s", raw, skey)
     return out
 
-def td_timeseries_daily(symbol: str, outputsize: int = 2) -> Dict[str, Any]:
+def td_timeseries_daily(symbol: str, outputsize: int = 2, start: Optional[str] = None,
+                        deadline: Optional[Deadline] = None) -> Dict[str, Any]:
     """
     'RBRTE' o 'BRENT' -> {"values":[{"datetime":"YYYY-MM-DD","close":85.1}, ...]} (orden desc).
+    Con `start` devuelve sólo los periodos >= start (puede venir vacío).
     """
     skey = _norm_series_id(symbol)
-    pairs = _eia_get_last_n(skey, outputsize) if skey else []
+    pairs = _eia_get_last_n(skey, outputsize, start=start, deadline=deadline) if skey else []
     values = [{"datetime": d, "close": v} for (d, v) in pairs]
-    if not values:
+    if not values and not start:
         current_app.logger.warning("Empty timeseries for input=%s mapped_series=%s", symbol, skey)
     return {"values": values}
 
-def parse_last_ts(ts_json: Dict[str, Any]):
-    vals = ts_json.get("values") or []
-    if not vals:
-        return None, None
-    d = str(vals[0].get("datetime", ""))[:10]
-    c = vals[0].get("close")
-    try:
-        c = float(c) if c is not None else None
-    except Exception:
-        c = None
-    return d, c
+Job = Tuple  # (outputsize, start) o (outputsize, start, route, frequency)
+
+def _job_key(job: Job) -> Tuple[int, Optional[str], str, str]:
+    outputsize, start = job[0], job[1]
+    route = job[2] if len(job) > 2 and job[2] else EIA_ROUTE
+    frequency = job[3] if len(job) > 3 and job[3] else "daily"
+    return int(outputsize), start, route, frequency
+
+def td_timeseries_many(jobs: Dict[str, Job], deadline: Optional[Deadline] = None) -> Dict[str, Dict[str, Any]]:
+    """
+    Varias series: {symbol: (outputsize, start[, route, frequency])} ->
+    {symbol: {"values": [...], "elapsed_ms": 123.4}} o, si falla,
+    {symbol: {"values": [], "error": "...", "elapsed_ms": ...}}.
+
+    Las series con la misma (route, frequency, outputsize, start) comparten
+    petición batch, partida en lotes de modo que cada uno quepa en una página
+    (outputsize * series <= EIA_PAGE_SIZE). En régimen normal es una petición
+    por ruta; los lotes se descargan en paralelo, todos bajo el mismo deadline,
+    así que añadir series no suma latencia por símbolo.
+    """
+    if deadline is None:
+        deadline = Deadline(_deadline_secs())
+    groups: Dict[Tuple[int, Optional[str], str, str], List[str]] = {}
+    for symbol, job in jobs.items():
+        groups.setdefault(_job_key(job), []).append(symbol)
+    batches: List[Tuple[Tuple[int, Optional[str], str, str], Tuple[str, ...]]] = []
+    for key, symbols in groups.items():
+        per_page = max(1, EIA_PAGE_SIZE // max(1, key[0]))
+        batches += [(key, tuple(symbols[i:i + per_page])) for i in range(0, len(symbols), per_page)]
+
+    def _group(batch_job) -> Dict[str, Dict[str, Any]]:
+        t0 = time.perf_counter()
+        (outputsize, start, route, frequency), symbols = batch_job
+        try:
+            batch = _eia_get_batch([_norm_series_id(s) for s in symbols], outputsize,
+                                   start=start, deadline=deadline, route=route, frequency=frequency)
+            if batch is not None:
+                error = None
+            elif eia_breaker.snapshot()["state"] == "open":
+                error = "EIA circuit open"
+            else:
+                error = "EIA request failed"
+        except Exception as e:
+            current_app.logger.exception("EIA fetch error inputs=%s", ",".join(symbols))
+            batch, error = None, str(e)
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+
+        res: Dict[str, Dict[str, Any]] = {}
+        for symbol in symbols:
+            if error:
+                res[symbol] = {"values": [], "error": error, "elapsed_ms": elapsed_ms}
+                continue
+            pairs = batch.get(_norm_series_id(symbol)) or []
+            res[symbol] = {"values": [{"datetime": d, "close": v} for (d, v) in pairs],
+                           "elapsed_ms": elapsed_ms}
+        return res
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for res in _run_parallel(_group, batches).values():
+        out.update(res)
+    return out
+
+def td_timeseries_chunks(symbols: List[str], ranges: List[Tuple[str, str]],
+                         deadline: Optional[Deadline] = None,
+                         routes: Optional[Dict[str, Tuple[str, str]]] = None) -> Dict[Tuple[str, str], Dict[str, Any]]:
+    """
+    Descarga histórica por tramos de fechas: {(start, end): {"values": {symbol: [...]}}}
+    (cada lista desc, formato de td_timeseries_daily) o {"values": {}, "error": "..."}.
+    `routes` = {symbol: (route, frequency)} (por defecto, spot diario). Cada
+    tramo es una petición batch por ruta con todas sus series; tramos y rutas
+    van en paralelo (EIA_MAX_WORKERS) y comparten el deadline.
+    """
+    if deadline is None:
+        deadline = Deadline(_deadline_secs())
+    routes = routes or {}
+    by_route: Dict[Tuple[str, str], List[str]] = {}
+    for symbol in symbols:
+        by_route.setdefault(routes.get(symbol) or (EIA_ROUTE, "daily"), []).append(symbol)
+
+    def _chunk(item) -> Dict[str, Any]:
+        (start, end), (route, frequency) = item
+        group = by_route[(route, frequency)]
+        t0 = time.perf_counter()
+        # Cota superior de observaciones del tramo (días naturales)
+        n = (datetime.date.fromisoformat(end) - datetime.date.fromisoformat(start)).days + 1
+        try:
+            batch = _eia_get_batch([_norm_series_id(s) for s in group], n, start=start, deadline=deadline,
+                                   end=end, route=route, frequency=frequency)
+            error = None if batch is not None else "EIA request failed"
+        except Exception as e:
+            current_app.logger.exception("EIA chunk error %s %s..%s", route, start, end)
+            batch, error = None, str(e)
+        elapsed_ms = round((time.perf_counter() - t0) * 1000, 1)
+        if error:
+            return {"values": {}, "error": error, "elapsed_ms": elapsed_ms}
+        values = {symbol: [{"datetime": d, "close": v} for (d, v) in batch.get(_norm_series_id(symbol)) or []]
+                  for symbol in group}
+        return {"values": values, "elapsed_ms": elapsed_ms}
+
+    out: Dict[Tuple[str, str], Dict[str, Any]] = {rng: {"values": {}, "elapsed_ms": 0.0} for rng in ranges}
+    fetched = _run_parallel(_chunk, [(rng, rf) for rng in ranges for rf in by_route])
+    for (rng, _), res in fetched.items():
+        merged = out[rng]
+        merged["values"].update(res["values"])
+        merged["elapsed_ms"] = max(merged["elapsed_ms"], res["elapsed_ms"])
+        if res.get("error"):
+            merged["error"] = res["error"]
+    return out
@@ -0,0 +1,111 @@
+# app/markets_analytics.py
+"""
+Indicadores de mercados con NumPy: la serie de cierres de un símbolo se
+carga una vez en un array (ascendente) y todo se calcula vectorizado.
+"""
+from typing import Any, Dict, Iterable, Optional, Tuple
+import numpy as np
+
+# Ventanas (en observaciones) para los cambios % del dashboard
+CHANGE_WINDOWS = (1, 5, 10, 30)
+MA_WINDOWS = (5, 20)
+VOL_WINDOW = 20
+TRADING_DAYS = 252
+
+
+def _f(x) -> Optional[float]:
+    """float de Python apto para JSON (NaN/inf -> None)."""
+    if x is None:
+        return None
+    x = float(x)
+    return x if np.isfinite(x) else None
+
+def pct_changes(closes: np.ndarray, windows: Iterable[int] = CHANGE_WINDOWS) -> Dict[int, Optional[float]]:
+    """Cambio % del último cierre frente a n observaciones atrás, para todas las ventanas a la vez."""
+    w = np.asarray(list(windows), dtype=np.int64)
+    out: Dict[int, Optional[float]] = {int(n): None for n in w}
+    ok = w < closes.size
+    if not ok.any():
+        return out
+    bases = closes[closes.size - 1 - w[ok]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        chg = (closes[-1] - bases) / bases * 100.0
+    for n, v in zip(w[ok], chg):
+        out[int(n)] = _f(v)
+    return out
+
+def moving_average(closes: np.ndarray, window: int) -> np.ndarray:
+    """Media móvil simple (longitud len - window + 1) vía suma acumulada."""
+    if window <= 0 or closes.size < window:
+        return np.empty(0, dtype=np.float64)
+    c = np.cumsum(np.insert(closes, 0, 0.0))
+    return (c[window:] - c[:-window]) / window
+
+def rolling_volatility(closes: np.ndarray, window: int = VOL_WINDOW) -> np.ndarray:
+    """Volatilidad anualizada (%) de los retornos logarítmicos en ventana móvil."""
+    if closes.size < window + 1:
+        return np.empty(0, dtype=np.float64)
+    r = np.diff(np.log(closes))
+    win = np.lib.stride_tricks.sliding_window_view(r, window)
+    return win.std(axis=1, ddof=1) * np.sqrt(TRADING_DAYS) * 100.0
+
+def max_drawdown(closes: np.ndarray) -> Optional[float]:
+    """Mayor caída (%) desde un máximo previo; negativa o 0."""
+    if closes.size == 0:
+        return None
+    peaks = np.maximum.accumulate(closes)
+    return _f(((closes / peaks) - 1.0).min() * 100.0)
+
+def indicators(closes: np.ndarray) -> Dict[str, Any]:
+    """Conjunto de indicadores del dashboard para una serie ascendente."""
+    out: Dict[str, Any] = {
+        "chg_pct": {str(n): v for n, v in pct_changes(closes).items()},
+        "max_drawdown_pct": max_drawdown(closes),
+    }
+    for w in MA_WINDOWS:
+        ma = moving_average(closes, w)
+        out[f"ma_{w}"] = _f(ma[-1]) if ma.size else None
+    vol = rolling_volatility(closes, VOL_WINDOW)
+    out[f"vol_{VOL_WINDOW}_pct"] = _f(vol[-1]) if vol.size else None
+    return out
+
+def spread(a: Tuple[np.ndarray, np.ndarray], b: Tuple[np.ndarray, np.ndarray]) -> Dict[str, Any]:
+    """
+    Diferencial a - b sobre las fechas comunes (p. ej. Brent–WTI).
+    Devuelve el último valor, su fecha y los cambios por ventana.
+    """
+    (da, ca), (db_, cb) = a, b
+    common, ia, ib = np.intersect1d(da, db_, assume_unique=True, return_indices=True)
+    if common.size == 0:
+        return {"value": None, "last_date": None, "chg": {}}
+    s = ca[ia] - cb[ib]
+    diffs: Dict[str, Optional[float]] = {}
+    for n in CHANGE_WINDOWS:
+        diffs[str(n)] = _f(s[-1] - s[-1 - n]) if s.size > n else None
+    return {"value": _f(s[-1]), "last_date": str(common[-1]), "chg": diffs}
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: índices de `threshold` puntos que conservan
+    la forma de la curva (primer y último punto siempre incluidos).
+    `x` numérico ascendente (p. ej. fechas como días), `y` valores.
+    """
+    n = y.size
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    # Límites de los threshold-2 buckets intermedios
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    out = np.empty(threshold, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Punto medio del bucket siguiente (o el último punto)
+        nlo, nhi = hi, (edges[i + 2] if i + 2 < edges.size else n)
+        cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        # Área del triángulo (a, candidato, centroide siguiente) para todo el bucket a la vez
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        out[i + 1] = a
+    return out
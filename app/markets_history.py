@@ -0,0 +1,135 @@
+# app/markets_history.py
+"""
+Histórico diario de mercados en memoria.
+
+MercadoDaily guarda la historia completa (índice único symbol+date); aquí
+se carga una vez por símbolo en arrays ordenados (fechas datetime64[D] y
+cierres float64), de modo que cortar un rango es una búsqueda binaria
+(np.searchsorted, O(log n)) sin volver a la BD ni a la EIA.
+"""
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+from .extensions import db
+from .models import MercadoDaily
+from .markets_analytics import lttb
+
+Series = Tuple[np.ndarray, np.ndarray]
+
+# Rangos que ofrece /mercados, en días naturales hacia atrás desde el último dato
+RANGES = {"1M": 31, "6M": 183, "1Y": 366, "5Y": 1827}
+# Límites del parámetro ?points= (tamaño máximo de un gráfico tras LTTB)
+MIN_POINTS, MAX_POINTS = 10, 2000
+# Entradas máximas de la caché LTTB (los rangos from/to de /mercados/series son libres)
+MAX_DOWNSAMPLED = 256
+
+_EMPTY: Series = (np.empty(0, dtype="datetime64[D]"), np.empty(0, dtype=np.float64))
+
+
+class HistoryCache:
+    """
+    Arrays por símbolo con caducidad (`ttl_secs`). El refresh invalida
+    explícitamente; la caducidad cubre a los otros workers de gunicorn.
+    """
+    def __init__(self, ttl_secs: float = 300):
+        self.ttl_secs = ttl_secs
+        self._lock = threading.Lock()
+        self._data: Dict[str, Series] = {}
+        self._loaded_at: Dict[str, float] = {}
+        # (symbol, rango, puntos) -> serie reducida con LTTB
+        self._downsampled: Dict[Tuple[str, Optional[str], int], Series] = {}
+
+    def _fresh(self, symbol: str, now: float) -> bool:
+        t = self._loaded_at.get(symbol)
+        return t is not None and now - t < self.ttl_secs
+
+    def load_many(self, symbols: Iterable[str]) -> Dict[str, Series]:
+        """{symbol: (fechas, cierres)} ascendentes; carga en una consulta los que falten."""
+        symbols = list(symbols)
+        now = time.monotonic()
+        with self._lock:
+            missing = [s for s in symbols if not self._fresh(s, now)]
+            if missing:
+                rows = (db.session.query(MercadoDaily.symbol, MercadoDaily.date, MercadoDaily.close)
+                        .filter(MercadoDaily.symbol.in_(missing))
+                        .order_by(MercadoDaily.symbol, MercadoDaily.date.asc())
+                        .all())
+                grouped: Dict[str, list] = {s: [] for s in missing}
+                for symbol, d, close in rows:
+                    grouped[symbol].append((d, close))
+                for symbol, pairs in grouped.items():
+                    self._drop_downsampled(symbol)
+                    self._data[symbol] = (
+                        np.array([d for (d, _) in pairs], dtype="datetime64[D]"),
+                        np.fromiter((c for (_, c) in pairs), dtype=np.float64, count=len(pairs)),
+                    )
+                    self._loaded_at[symbol] = now
+            return {s: self._data.get(s, _EMPTY) for s in symbols}
+
+    def get(self, symbol: str) -> Series:
+        return self.load_many([symbol])[symbol]
+
+    def _drop_downsampled(self, symbol: str) -> None:
+        for k in [k for k in self._downsampled if k[0] == symbol]:
+            del self._downsampled[k]
+
+    def downsampled(self, symbol: str, series: Series, range_code: Optional[str], points: int) -> Series:
+        """
+        `series` (ya recortada a `range_code`) reducida a `points` con LTTB.
+        Se cachea por (symbol, range_code, points) hasta la próxima recarga del símbolo.
+        """
+        dates, closes = series
+        if points >= dates.size:
+            return series
+        key = (symbol, range_code, points)
+        with self._lock:
+            hit = self._downsampled.get(key)
+        if hit is not None:
+            return hit
+        idx = lttb(dates.astype(np.int64), closes, points)
+        res = (dates[idx], closes[idx])
+        with self._lock:
+            if len(self._downsampled) >= MAX_DOWNSAMPLED:
+                self._downsampled.pop(next(iter(self._downsampled)))  # el más antiguo
+            self._downsampled[key] = res
+        return res
+
+    def invalidate(self, symbols: Optional[Iterable[str]] = None) -> None:
+        with self._lock:
+            if symbols is None:
+                self._data.clear()
+                self._loaded_at.clear()
+                self._downsampled.clear()
+            else:
+                for s in symbols:
+                    self._data.pop(s, None)
+                    self._loaded_at.pop(s, None)
+                    self._drop_downsampled(s)
+
+
+history = HistoryCache()
+
+
+def slice_dates(series: Series, start=None, end=None) -> Series:
+    """Sub-rango [start, end] (ambos inclusive, None = abierto) por búsqueda binaria."""
+    dates, closes = series
+    i = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "D"), side="left"))
+    j = dates.size if end is None else int(np.searchsorted(dates, np.datetime64(end, "D"), side="right"))
+    return dates[i:j], closes[i:j]
+
+def parse_points(raw) -> Optional[int]:
+    """?points= acotado a [MIN_POINTS, MAX_POINTS]; None si no viene o no es entero."""
+    try:
+        n = int(raw)
+    except (TypeError, ValueError):
+        return None
+    return max(MIN_POINTS, min(MAX_POINTS, n))
+
+def slice_range(series: Series, code: str) -> Series:
+    """Últimos RANGES[code] días naturales contados desde el último dato."""
+    dates, _ = series
+    days = RANGES.get((code or "").upper())
+    if days is None or dates.size == 0:
+        return series
+    return slice_dates(series, start=dates[-1] - np.timedelta64(days, "D"))
@@ -0,0 +1,178 @@
+# app/markets_live.py
+"""
+Actualizaciones en vivo de mercados (Server-Sent Events).
+
+Un único hilo por proceso consulta MercadoUltimo cada POLL_SECS y, sólo si
+cambió, despierta a todos los clientes conectados con un delta compacto.
+La carga depende de la frecuencia de los refrescos, no de las pestañas
+abiertas: cada conexión está dormida en un Condition hasta que hay algo
+que enviar (o toca keepalive).
+
+Con el worker gevent de gunicorn cada conexión es un greenlet; con
+gthread ocupa un hilo, así que la duración de la conexión se acota y el
+navegador reconecta (Last-Event-ID evita perder cambios entre medias).
+"""
+import hashlib
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, Optional, Tuple
+from .extensions import db
+from .models import MercadoUltimo
+
+# Cada cuánto mira cada proceso si MercadoUltimo cambió
+POLL_SECS = 20
+# Comentario SSE para que proxies/navegador no cierren la conexión inactiva
+KEEPALIVE_SECS = 25
+# Vida máxima de una conexión: larga con greenlets, corta si ocupa un hilo
+MAX_SECS_COOPERATIVE = 3600
+MAX_SECS_BLOCKING = 55
+# Espera antes de reconectar que sugerimos al navegador (ms)
+RETRY_MS_COOPERATIVE = 5000
+RETRY_MS_BLOCKING = 30000
+
+Snapshot = Dict[str, Dict[str, Any]]
+
+
+def cooperative() -> bool:
+    """True si corremos bajo gevent con sockets parcheados (worker gevent de gunicorn)."""
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("socket")
+
+def _snapshot_id(snap: Snapshot) -> str:
+    """Id estable entre procesos: el mismo estado da el mismo Last-Event-ID en cualquier worker."""
+    raw = json.dumps(snap, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+class MarketsBroadcaster:
+    """
+    Estado actual de MercadoUltimo + último delta, compartido por todas las
+    conexiones SSE del proceso. El hilo de sondeo arranca con el primer
+    suscriptor y termina cuando no queda ninguno.
+    """
+    def __init__(self, poll_secs: float = POLL_SECS):
+        self.poll_secs = poll_secs
+        self._cond = threading.Condition()
+        self._wake = threading.Event()
+        self._app = None
+        self._thread: Optional[threading.Thread] = None
+        self._subscribers = 0
+        self._snap: Optional[Snapshot] = None
+        self._id: Optional[str] = None
+        self._prev_id: Optional[str] = None
+        self._delta: Snapshot = {}
+
+    # --- sondeo ---
+    def _read(self) -> Snapshot:
+        rows = db.session.query(MercadoUltimo.symbol, MercadoUltimo.value,
+                                MercadoUltimo.stale, MercadoUltimo.asof).all()
+        db.session.remove()  # no retener una conexión del pool entre sondeos
+        return {symbol: {"value": value, "stale": bool(stale), "asof": asof}
+                for symbol, value, stale, asof in rows}
+
+    def _publish(self, snap: Snapshot) -> None:
+        with self._cond:
+            old = self._snap
+            if old == snap:
+                return
+            self._snap = snap
+            self._prev_id, self._id = self._id, _snapshot_id(snap)
+            self._delta = {k: v for k, v in snap.items() if old is None or old.get(k) != v}
+            first = old is None
+            self._cond.notify_all()
+        if not first:
+            # Otro worker (o el cron) refrescó: vaciamos las cachés de este proceso
+            from .markets_history import history
+            from .markets_store import dashboard_cache
+            history.invalidate(list(self._delta))
+            dashboard_cache.invalidate()
+
+    def _run(self) -> None:
+        log = self._app.logger
+        while True:
+            with self._cond:
+                if self._subscribers == 0:
+                    self._thread = None
+                    return
+            try:
+                with self._app.app_context():
+                    self._publish(self._read())
+            except Exception as e:  # la BD puede fallar puntualmente; se reintenta en el siguiente ciclo
+                log.warning("mercados live: sondeo fallido: %s", e)
+            self._wake.wait(self.poll_secs)
+            self._wake.clear()
+
+    def poke(self) -> None:
+        """Sondear ya (p. ej. tras un refresh en este mismo proceso)."""
+        self._wake.set()
+
+    # --- suscripción ---
+    def subscribe(self, app) -> None:
+        with self._cond:
+            self._subscribers += 1
+            self._app = app
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="mercados-live", daemon=True)
+                self._thread.start()
+
+    def unsubscribe(self) -> None:
+        with self._cond:
+            self._subscribers = max(0, self._subscribers - 1)
+            idle = self._subscribers == 0
+        if idle:
+            self._wake.set()
+
+    def wait(self, last_id: Optional[str], timeout: float) -> Optional[Tuple[str, Snapshot]]:
+        """
+        Bloquea hasta que el estado difiera de `last_id` o venza `timeout`.
+        Devuelve (id, payload): el delta si el cliente venía del estado
+        inmediatamente anterior, el estado completo si se saltó alguno.
+        """
+        with self._cond:
+            if self._id is None or self._id == last_id:
+                self._cond.wait(timeout)
+            if self._id is None or self._id == last_id:
+                return None
+            if last_id is not None and last_id == self._prev_id:
+                return self._id, self._delta
+            return self._id, dict(self._snap)
+
+
+live = MarketsBroadcaster()
+
+
+def sse_stream(app, last_id: Optional[str]) -> Iterator[str]:
+    """
+    Generador del cuerpo text/event-stream. `last_id` es el Last-Event-ID
+    del navegador (None en la primera conexión: sólo recibirá cambios futuros).
+    """
+    coop = cooperative()
+    max_secs = MAX_SECS_COOPERATIVE if coop else MAX_SECS_BLOCKING
+    deadline = time.monotonic() + max_secs
+    live.subscribe(app)
+    try:
+        yield f"retry: {RETRY_MS_COOPERATIVE if coop else RETRY_MS_BLOCKING}\n\n"
+        if last_id is None:
+            # Esperamos a conocer el estado actual para tomarlo como punto de partida
+            got = live.wait(None, min(KEEPALIVE_SECS, max_secs))
+            last_id = got[0] if got else None
+            if last_id is not None:
+                yield f"id: {last_id}\n\n"
+        while True:
+            left = deadline - time.monotonic()
+            if left <= 0:
+                return
+            got = live.wait(last_id, min(KEEPALIVE_SECS, left))
+            if got is None:
+                yield ": keepalive\n\n"
+                continue
+            last_id, payload = got
+            data = json.dumps({"markets": [{"id": k, **v} for k, v in sorted(payload.items())]},
+                              separators=(",", ":"))
+            yield f"id: {last_id}\nevent: markets\ndata: {data}\n\n"
+    finally:
+        live.unsubscribe()
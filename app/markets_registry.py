@@ -0,0 +1,77 @@
+# app/markets_registry.py
+"""
+Registro de series de mercados: qué se descarga de la EIA y qué tarjetas
+muestra /mercados. Se define en Config.MERCADOS_SERIES; añadir una serie es
+añadir una entrada, sin código por símbolo.
+
+Si una instalación antigua sólo define TWELVEDATA_SYMBOLS ({clave: serie}),
+se interpreta como series spot de petróleo diarias en USD/bbl.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List
+from flask import current_app
+
+DEFAULT_ROUTE = "petroleum/pri/spt"
+DEFAULT_UNIT = "USD/bbl"
+
+# Por frecuencia: observaciones por año, días sin dato nuevo para marcarlo
+# no reciente y hueco máximo que se rellena de forma incremental
+FREQUENCIES = {
+    "daily":   {"per_year": 262, "stale_days": 10, "gap_days": 45},
+    "weekly":  {"per_year": 52, "stale_days": 17, "gap_days": 120},
+    "monthly": {"per_year": 12, "stale_days": 75, "gap_days": 400},
+}
+# Años que trae una recarga completa (serie nueva o hueco grande)
+BACKFILL_YEARS = 5
+
+
+@dataclass(frozen=True)
+class SeriesDef:
+    key: str                    # clave de tarjeta / MercadoDaily.symbol ('brent')
+    series: str                 # serie EIA ('RBRTE')
+    route: str = DEFAULT_ROUTE  # ruta v2 ('petroleum/pri/spt', 'natural-gas/pri/fut')
+    frequency: str = "daily"
+    unit: str = DEFAULT_UNIT
+    label: str = ""
+
+    @property
+    def stale_days(self) -> int:
+        return FREQUENCIES[self.frequency]["stale_days"]
+
+    @property
+    def gap_days(self) -> int:
+        return FREQUENCIES[self.frequency]["gap_days"]
+
+    @property
+    def backfill_rows(self) -> int:
+        return BACKFILL_YEARS * FREQUENCIES[self.frequency]["per_year"]
+
+    def as_json(self) -> Dict[str, Any]:
+        return {"id": self.key, "series": self.series, "route": self.route,
+                "frequency": self.frequency, "unit": self.unit, "label": self.label}
+
+
+def _parse(entry: Dict[str, Any]) -> SeriesDef:
+    sdef = SeriesDef(
+        key=str(entry["key"]).strip().lower(),
+        series=str(entry["series"]).strip().upper(),
+        route=str(entry.get("route") or DEFAULT_ROUTE).strip("/"),
+        frequency=str(entry.get("frequency") or "daily").lower(),
+        unit=entry.get("unit") or DEFAULT_UNIT,
+        label=entry.get("label") or str(entry["key"]).upper(),
+    )
+    if sdef.frequency not in FREQUENCIES:
+        raise ValueError(f"MERCADOS_SERIES[{sdef.key}]: frecuencia no soportada '{sdef.frequency}'")
+    return sdef
+
+def registry() -> Dict[str, SeriesDef]:
+    """{clave: SeriesDef} en el orden de la config (es el orden de las tarjetas)."""
+    entries: List[Dict[str, Any]] = current_app.config.get("MERCADOS_SERIES") or [
+        {"key": key, "series": series}
+        for key, series in (current_app.config.get("TWELVEDATA_SYMBOLS") or {}).items()
+    ]
+    out: Dict[str, SeriesDef] = {}
+    for entry in entries:
+        sdef = _parse(entry)
+        out[sdef.key] = sdef
+    return out
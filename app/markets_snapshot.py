@@ -0,0 +1,147 @@
+# app/markets_snapshot.py
+"""
+Snapshots del dashboard de mercados en disco, ya comprimidos.
+
+Tras cada refresh se escribe una vez el JSON de /mercados/dashboard.json
+(por defecto y por cada rango de los botones) junto con sus variantes .br,
+.zst y .gz en instance/mercados/ (o en MERCADOS_SNAPSHOT_DIR). mercados_json sirve la variante que
+acepte el navegador con un ETag fuerte por codificación: sin serializar
+JSON ni comprimir por petición (Flask-Compress no toca respuestas que ya
+traen Content-Encoding).
+
+Cada worker guarda en memoria el último snapshot leído y sólo vuelve a
+disco cuando cambia el mtime del fichero, así que todos los workers ven el
+refresh en cuanto se escribe.
+"""
+import gzip
+import hashlib
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import brotli
+import pyzstd
+from flask import current_app
+from .markets_history import RANGES
+
+SNAPSHOT_DIR = "mercados"
+# Puntos de los gráficos con rango (los que pide mercados.html)
+SNAPSHOT_POINTS = 200
+# (content-coding, extensión), por orden de preferencia
+ENCODINGS = (("br", ".br"), ("zstd", ".zst"), ("gzip", ".gz"))
+
+_COMPRESS: Dict[str, Callable[[bytes], bytes]] = {
+    "br": lambda b: brotli.compress(b, quality=11),
+    "zstd": lambda b: pyzstd.compress(b, 19),
+    "gzip": lambda b: gzip.compress(b, 9, mtime=0),
+}
+_DECOMPRESS: Dict[str, Callable[[bytes], bytes]] = {
+    "br": brotli.decompress,
+    "zstd": pyzstd.decompress,
+    "gzip": gzip.decompress,
+}
+
+
+def variants() -> List[Tuple[Optional[str], Optional[int]]]:
+    """(rango, puntos) que se precalculan: el dashboard por defecto y cada botón de rango."""
+    return [(None, None)] + [(code, SNAPSHOT_POINTS) for code in RANGES]
+
+def _dir() -> str:
+    return (current_app.config.get("MERCADOS_SNAPSHOT_DIR")
+            or os.path.join(current_app.instance_path, SNAPSHOT_DIR))
+
+def _name(range_code: Optional[str], points: Optional[int]) -> str:
+    if range_code is None and points is None:
+        return "dashboard.json"
+    return f"dashboard-{range_code or 'all'}-{points or 'full'}.json"
+
+def _write_atomic(path: str, data: bytes) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class Snapshot:
+    """Cuerpos por codificación ('identity', 'br', 'zstd', 'gzip') y su ETag fuerte."""
+    def __init__(self, bodies: Dict[str, bytes], digest: str, mtime_ns: int):
+        self.bodies = bodies
+        self.digest = digest
+        self.mtime_ns = mtime_ns
+
+    def etag(self, encoding: str) -> str:
+        # Representaciones distintas -> ETags fuertes distintos
+        return self.digest if encoding == "identity" else f"{self.digest}-{encoding}"
+
+    def negotiate(self, accept_encodings) -> str:
+        """Mejor codificación disponible según Accept-Encoding (werkzeug Accept)."""
+        best, best_q = "identity", 0.0
+        for encoding, _ in ENCODINGS:
+            q = accept_encodings.quality(encoding) if encoding in self.bodies else 0
+            if q > best_q:
+                best, best_q = encoding, q
+        return best
+
+
+def write_snapshots(build: Callable[[Optional[str], Optional[int]], dict],
+                    targets: Optional[Iterable[Tuple[Optional[str], Optional[int]]]] = None) -> int:
+    """
+    Serializa build(rango, puntos) una vez por variante y la escribe con sus
+    versiones comprimidas. El .json va el último: su mtime marca el snapshot
+    como nuevo. Devuelve cuántos snapshots se escribieron.
+    """
+    base = _dir()
+    os.makedirs(base, exist_ok=True)
+    n = 0
+    for range_code, points in (targets or variants()):
+        body = current_app.json.dumps(build(range_code, points)).encode("utf-8")
+        path = os.path.join(base, _name(range_code, points))
+        for encoding, ext in ENCODINGS:
+            _write_atomic(path + ext, _COMPRESS[encoding](body))
+        _write_atomic(path, body)
+        n += 1
+    return n
+
+
+class SnapshotReader:
+    """Caché por proceso de los snapshots leídos, revalidada por mtime."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded: Dict[str, Snapshot] = {}
+
+    def get(self, range_code: Optional[str], points: Optional[int]) -> Optional[Snapshot]:
+        path = os.path.join(_dir(), _name(range_code, points))
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return None
+        with self._lock:
+            snap = self._loaded.get(path)
+        if snap is not None and snap.mtime_ns == mtime_ns:
+            return snap
+
+        try:
+            with open(path, "rb") as f:
+                body = f.read()
+        except OSError:
+            return None
+        bodies = {"identity": body}
+        complete = True
+        for encoding, ext in ENCODINGS:
+            try:
+                with open(path + ext, "rb") as f:
+                    data = f.read()
+                # Un refresh puede estar escribiendo: sólo se sirve si cuadra con el .json
+                if _DECOMPRESS[encoding](data) == body:
+                    bodies[encoding] = data
+                else:
+                    complete = False
+            except (OSError, ValueError, brotli.error, pyzstd.ZstdError):
+                complete = False
+        snap = Snapshot(bodies, hashlib.sha1(body).hexdigest(), mtime_ns)
+        if complete:
+            with self._lock:
+                self._loaded[path] = snap
+        return snap
+
+
+snapshots = SnapshotReader()
@@ -0,0 +1,483 @@
+# app/markets_store.py
+"""
+Persistencia de los datos de mercados (MercadoUltimo / MercadoDaily).
+
+- refresh_markets(): único camino que habla con la EIA; escribe en BD.
+- load_dashboard(): lo que consume /mercados/dashboard.json; sólo lee BD
+  (MercadoUltimo) y el histórico en memoria (markets_history).
+"""
+import hashlib
+import json
+import os
+import time
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from flask import current_app
+from sqlalchemy import func
+from .extensions import db
+from .models import MercadoUltimo, MercadoDaily
+from . import markets_analytics as analytics
+from .markets_history import history, slice_dates, slice_range, RANGES
+from .markets import (Deadline, EIA_MAX_WORKERS, eia_breaker, td_timeseries_chunks, td_timeseries_many,
+                      _norm_series_id)
+from .markets_registry import SeriesDef, registry
+from .markets_snapshot import write_snapshots
+from .cache import SWRCache
+from .utils import bulk_upsert_daily
+
+# Puntos del sparkline por defecto: 31 para el cambio a 30 observaciones + margen
+SPARK_POINTS = 32
+# Con ?range= y sin ?points=, los gráficos se reducen (LTTB) a este máximo
+RANGE_POINTS = 250
+# Backfill histórico (`flask markets backfill`): ~4 años por tramo = ~2100 filas
+# para Brent+WTI, una sola página de la EIA por tramo
+BACKFILL_CHUNK_DAYS = 4 * 365
+# Progreso de los backfill interrumpidos: un fichero por trabajo en instance/
+BACKFILL_PROGRESS_DIR = "markets_backfill"
+# Caché del JSON del dashboard por worker: fresco 5 min, rancio (servido mientras
+# una sola petición lo recalcula) hasta 1 h. El refresh la vacía en su worker.
+DASHBOARD_FRESH_SECS = 300
+DASHBOARD_STALE_SECS = 3600
+dashboard_cache = SWRCache(DASHBOARD_FRESH_SECS, DASHBOARD_STALE_SECS)
+# Diferenciales que publica el dashboard: nombre -> (clave a, clave b)
+SPREADS = {"brent_wti": ("brent", "wti")}
+
+
+def _symbols() -> Dict[str, str]:
+    """{'brent': 'RBRTE', 'wti': 'RWTC', ...} según el registro (config MERCADOS_SERIES)."""
+    return {key: sdef.series for key, sdef in registry().items()}
+
+def _retention() -> Optional[int]:
+    """Filas por símbolo a conservar en MercadoDaily (None = historia completa)."""
+    return current_app.config.get("MERCADOS_DAILY_RETENTION")
+
+def keys_from_query(symbols_csv: Optional[str]) -> List[str]:
+    """
+    Traduce el parámetro ?s= (alias o series EIA) a claves de tarjeta ('brent', 'wti').
+    Sin parámetro, devuelve todas las configuradas.
+    """
+    symbols = _symbols()
+    if not symbols_csv:
+        return list(symbols)
+    by_series = {_norm_series_id(series): key for key, series in symbols.items()}
+    keys: List[str] = []
+    for raw in [s.strip() for s in symbols_csv.split(",") if s.strip()]:
+        key = raw.lower() if raw.lower() in symbols else by_series.get(_norm_series_id(raw))
+        if key and key not in keys:
+            keys.append(key)
+    return keys
+
+def _parse_iso(d: Optional[str]) -> Optional[date]:
+    try:
+        y, m, dd = [int(x) for x in (d or "").split("-")]
+        return date(y, m, dd)
+    except Exception:
+        return None
+
+def _is_stale(last_date: Optional[str], stale_days: int) -> bool:
+    d = _parse_iso(last_date)
+    return d is not None and (date.today() - d).days > stale_days
+
+# ---------- Escritura (refresh) ----------
+def _upsert_ultimo(sdef: SeriesDef, last_date: str, last_close: float, now_iso: str) -> None:
+    ultimo = MercadoUltimo.query.filter_by(symbol=sdef.key).first()
+    if ultimo is None:
+        ultimo = MercadoUltimo(symbol=sdef.key)
+        db.session.add(ultimo)
+    ultimo.value = last_close
+    ultimo.unit = sdef.unit
+    ultimo.asof = now_iso
+    ultimo.stale = _is_stale(last_date, sdef.stale_days)
+
+def _mark_stale(key: str) -> None:
+    """Sin datos nuevos por fallo de la EIA: se sigue sirviendo el último valor, marcado como no reciente."""
+    ultimo = MercadoUltimo.query.filter_by(symbol=key).first()
+    if ultimo is not None and not ultimo.stale:
+        ultimo.stale = True
+        db.session.commit()
+
+def _last_stored(keys: List[str]) -> Dict[str, tuple]:
+    """
+    {clave: (date, close)} más reciente guardado: es la marca de agua del sync.
+    Una sola consulta para todas las claves.
+    """
+    latest = (db.session.query(MercadoDaily.symbol, func.max(MercadoDaily.date).label("date"))
+              .filter(MercadoDaily.symbol.in_(keys))
+              .group_by(MercadoDaily.symbol)
+              .subquery())
+    rows = (db.session.query(MercadoDaily.symbol, MercadoDaily.date, MercadoDaily.close)
+            .join(latest, (MercadoDaily.symbol == latest.c.symbol) & (MercadoDaily.date == latest.c.date))
+            .all())
+    return {symbol: (d, close) for symbol, d, close in rows}
+
+def _plan(last: Optional[tuple], sdef: SeriesDef) -> tuple:
+    """
+    Sync incremental: sólo pedimos a la EIA lo posterior a la marca de agua.
+    Serie nueva o hueco mayor que sdef.gap_days -> recarga completa de
+    sdef.backfill_rows observaciones.
+    """
+    watermark = _parse_iso(last[0]) if last else None
+    if watermark and (date.today() - watermark).days <= sdef.gap_days:
+        return "incremental", (watermark + timedelta(days=1)).isoformat()
+    return "backfill", None
+
+def _outputsize(sdef: SeriesDef, plan: tuple) -> int:
+    """Observaciones a pedir: en incremental, como mucho los días desde la marca de agua
+    (así las series con la misma marca caben juntas en una petición por ruta)."""
+    mode, start = plan
+    if mode == "incremental":
+        return max(1, min(sdef.backfill_rows, (date.today() - _parse_iso(start)).days + 1))
+    return sdef.backfill_rows
+
+def _store_one(sdef: SeriesDef, values: List[dict], last: Optional[tuple], mode: str, now_iso: str) -> Dict[str, Any]:
+    if not values and mode == "backfill":
+        raise RuntimeError("EIA no devolvió datos")
+
+    inserted = bulk_upsert_daily(
+        db.session, ((sdef.key, v["datetime"], v["close"]) for v in values), MercadoDaily, keep=_retention()
+    )
+
+    if values:
+        last_date, last_close = values[0]["datetime"], float(values[0]["close"])
+    else:
+        last_date, last_close = last  # nada nuevo: recalculamos con lo guardado
+    _upsert_ultimo(sdef, last_date, last_close, now_iso)
+    return {"rows": len(values), "inserted": inserted, "last_date": last_date, "value": last_close}
+
+def refresh_markets() -> Dict[str, Any]:
+    """
+    Trae de la EIA los cierres posteriores a la marca de agua de cada serie
+    del registro (o ~5 años si no hay marca) y actualiza MercadoDaily +
+    MercadoUltimo. Las descargas van en paralelo (una petición batch por ruta
+    y frecuencia); la escritura es secuencial y cada serie se confirma por
+    separado, así que un fallo en una no tira las demás.
+
+    Devuelve un informe:
+    {
+      "ok": true,
+      "asof": "...Z",
+      "elapsed_ms": 812.4,
+      "series": [{"id": "brent", "series": "RBRTE", "mode": "incremental",
+                  "since": "YYYY-MM-DD", "rows": 1, "inserted": 1,
+                  "last_date": "YYYY-MM-DD", "value": 67.8,
+                  "fetch_ms": 380.1, "elapsed_ms": 401.2}, ...],
+      "failures": [{"id": "wti", "series": "RWTC", "error": "..."}],
+      "breaker": {"state": "closed", "trips": 0, ...}
+    }
+    Las series que fallan conservan su último valor y quedan marcadas stale.
+    """
+    t0 = time.perf_counter()
+    now_iso = datetime.now(timezone.utc).isoformat(timespec="seconds")
+    report: Dict[str, Any] = {"asof": now_iso, "series": [], "failures": []}
+
+    defs = registry()
+    last_by_key = _last_stored(list(defs))
+    plans = {key: _plan(last_by_key.get(key), sdef) for key, sdef in defs.items()}
+    deadline = Deadline(current_app.config.get("EIA_DEADLINE_SECS", 30))
+    fetched = td_timeseries_many(
+        {sdef.series: (_outputsize(sdef, plans[key]), plans[key][1], sdef.route, sdef.frequency)
+         for key, sdef in defs.items()},
+        deadline=deadline,
+    )
+
+    for key, sdef in defs.items():
+        series = sdef.series
+        ts = time.perf_counter()
+        mode, start = plans[key]
+        res = fetched.get(series) or {"values": []}
+        item: Dict[str, Any] = {"id": key, "series": series, "mode": mode, "since": start,
+                                "fetch_ms": res.get("elapsed_ms")}
+        try:
+            if res.get("error"):
+                raise RuntimeError(res["error"])
+            item.update(_store_one(sdef, res["values"], last_by_key.get(key), mode, now_iso))
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            current_app.logger.exception("Refresh mercados falló para %s (%s)", key, series)
+            item["error"] = str(e)
+            report["failures"].append({"id": key, "series": series, "error": str(e)})
+            _mark_stale(key)
+        item["elapsed_ms"] = round((time.perf_counter() - ts) * 1000 + (res.get("elapsed_ms") or 0), 1)
+        report["series"].append(item)
+
+    history.invalidate(defs)
+    dashboard_cache.invalidate()
+    report["snapshots"] = write_dashboard_snapshots()
+    report["ok"] = not report["failures"]
+    report["breaker"] = eia_breaker.snapshot()
+    report["elapsed_ms"] = round((time.perf_counter() - t0) * 1000, 1)
+    return report
+
+# ---------- Backfill histórico ----------
+def _chunks(since: date, until: date, chunk_days: int) -> List[Tuple[str, str]]:
+    """[since, until] partido en tramos consecutivos de chunk_days días (ISO, inclusivos)."""
+    out, d = [], since
+    while d <= until:
+        e = min(until, d + timedelta(days=chunk_days - 1))
+        out.append((d.isoformat(), e.isoformat()))
+        d = e + timedelta(days=1)
+    return out
+
+def _progress_path(job: str) -> str:
+    name = hashlib.sha1(job.encode("utf-8")).hexdigest()[:16] + ".json"
+    return os.path.join(current_app.instance_path, BACKFILL_PROGRESS_DIR, name)
+
+def _load_progress(job: str) -> Optional[Dict[str, Any]]:
+    """{"until", "done"} de un backfill interrumpido con los mismos parámetros, o None."""
+    try:
+        with open(_progress_path(job), encoding="utf-8") as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if saved.get("job") != job:
+        return None
+    return {"until": date.fromisoformat(saved["until"]), "done": {tuple(c) for c in saved.get("done", [])}}
+
+def _save_progress(job: str, until: date, done: set) -> None:
+    path = _progress_path(job)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({"job": job, "until": until.isoformat(), "done": sorted(done)}, f)
+    os.replace(tmp, path)  # atómico: una interrupción no deja el fichero a medias
+
+def _clear_progress(job: str) -> None:
+    try:
+        os.remove(_progress_path(job))
+    except OSError:
+        pass
+
+def backfill_markets(keys: List[str], since: date, until: Optional[date] = None,
+                     chunk_days: int = BACKFILL_CHUNK_DAYS, resume: bool = True,
+                     on_wave: Optional[Callable[[Dict[str, Any]], None]] = None) -> Dict[str, Any]:
+    """
+    Carga la historia diaria de `keys` entre since y until (hoy por defecto) en
+    MercadoDaily. El rango se parte en tramos de chunk_days; cada tanda de
+    EIA_MAX_WORKERS tramos se descarga en paralelo (una petición batch por
+    tramo con todas las series) y se inserta sin pisar filas existentes
+    (ON CONFLICT DO NOTHING). Tras cada tanda se confirma y se apunta el
+    progreso en instance/markets_backfill/ (un fichero por trabajo), así que
+    una ejecución interrumpida retoma donde iba. Sin `until`, el trabajo no
+    depende del día: al reanudar se usa el `until` guardado en el progreso.
+    `on_wave` recibe el avance tras cada tanda.
+
+    Devuelve {"chunks", "skipped", "rows", "inserted", "failed": [...],
+              "elapsed_ms", "rows_per_s"}.
+    """
+    t0 = time.perf_counter()
+    defs = registry()
+    keys = [k for k in keys if k in defs]
+    job = f"{','.join(keys)}|{since.isoformat()}|{until.isoformat() if until else '*'}|{chunk_days}"
+    saved = _load_progress(job) if resume else None
+    done = saved["done"] if saved else set()
+    until = until or (saved["until"] if saved else date.today())
+    ranges = _chunks(since, until, max(1, int(chunk_days)))
+    pending = [r for r in ranges if r not in done]
+    report: Dict[str, Any] = {"chunks": len(ranges), "skipped": len(ranges) - len(pending),
+                              "rows": 0, "inserted": 0, "failed": []}
+
+    by_series = {defs[k].series: k for k in keys}
+    routes = {defs[k].series: (defs[k].route, defs[k].frequency) for k in keys}
+    for i in range(0, len(pending), EIA_MAX_WORKERS):
+        wave = pending[i:i + EIA_MAX_WORKERS]
+        fetched = td_timeseries_chunks(list(by_series), wave, routes=routes)
+        for rng in wave:
+            res = fetched.get(rng) or {"values": {}, "error": "sin respuesta"}
+            if res.get("error"):
+                report["failed"].append({"start": rng[0], "end": rng[1], "error": res["error"]})
+                continue
+            rows = [(by_series[series], v["datetime"], v["close"])
+                    for series, values in res["values"].items() for v in values]
+            report["inserted"] += bulk_upsert_daily(db.session, rows, MercadoDaily,
+                                                    keep=_retention(), update=False)
+            report["rows"] += len(rows)
+            done.add(rng)
+        db.session.commit()
+        _save_progress(job, until, done)
+        if on_wave:
+            on_wave({"done": len(done), "chunks": len(ranges), "rows": report["rows"],
+                     "elapsed_ms": round((time.perf_counter() - t0) * 1000, 1)})
+
+    if not report["failed"]:
+        _clear_progress(job)
+    history.invalidate(keys)
+    dashboard_cache.invalidate()
+    write_dashboard_snapshots()
+    secs = time.perf_counter() - t0
+    report["elapsed_ms"] = round(secs * 1000, 1)
+    report["rows_per_s"] = round(report["rows"] / secs) if secs > 0 else None
+    return report
+
+def markets_status() -> Dict[str, Any]:
+    """Estado para monitorización: circuit breaker de la EIA + frescura por serie."""
+    ultimos = MercadoUltimo.query.order_by(MercadoUltimo.symbol).all()
+    return {
+        "breaker": eia_breaker.snapshot(),
+        "series": [{"id": u.symbol, "value": u.value, "asof": u.asof, "stale": bool(u.stale)} for u in ultimos],
+    }
+
+# ---------- Lectura (series históricas) ----------
+RESAMPLES = ("daily", "weekly", "monthly")
+
+def _period_key(d: str, resample: str) -> str:
+    if resample == "monthly":
+        return d[:7]
+    if resample == "weekly":
+        y, w, _ = _parse_iso(d).isocalendar()
+        return f"{y}-W{w:02d}"
+    return d
+
+def series_version(key: str, start: Optional[str], end: Optional[str]) -> Tuple[int, Optional[str], str]:
+    """
+    (filas, última fecha, sha1 de los (fecha, cierre) ordenados) del tramo:
+    base del ETag de /mercados/series. El hash recoge cualquier revisión de
+    valores de bulk_upsert_daily(update=True), aunque no cambie filas, fechas
+    ni la suma. Lee sólo dos columnas por bloques, sin materializar la serie.
+    """
+    q = (db.session.query(MercadoDaily.date, MercadoDaily.close)
+         .filter(MercadoDaily.symbol == key))
+    if start:
+        q = q.filter(MercadoDaily.date >= start)
+    if end:
+        q = q.filter(MercadoDaily.date <= end)
+    h = hashlib.sha1()
+    n, last = 0, None
+    for d, close in q.order_by(MercadoDaily.date).yield_per(2000):
+        h.update(f"{d}={close!r};".encode())
+        n, last = n + 1, d
+    return n, last, h.hexdigest()
+
+def downsampled_series(key: str, start: Optional[str], end: Optional[str], points: int) -> List[tuple]:
+    """[(date, close), ...] del tramo reducido con LTTB desde el histórico en memoria (cacheado)."""
+    sliced = slice_dates(history.get(key), start, end)
+    dates, closes = history.downsampled(key, sliced, f"{start}..{end}", points)
+    return list(zip(dates.astype(str).tolist(), closes.tolist()))
+
+def iter_series(key: str, start: Optional[str], end: Optional[str], resample: str = "daily"):
+    """
+    Genera (date, close, high, low) ascendente leyendo MercadoDaily por bloques
+    (yield_per), sin materializar la serie. Con weekly/monthly agrega en vuelo:
+    date = última sesión del periodo, close = su cierre, high/low = extremos.
+    """
+    q = (db.session.query(MercadoDaily.date, MercadoDaily.close)
+         .filter(MercadoDaily.symbol == key))
+    if start:
+        q = q.filter(MercadoDaily.date >= start)
+    if end:
+        q = q.filter(MercadoDaily.date <= end)
+    q = q.order_by(MercadoDaily.date.asc()).execution_options(yield_per=500)
+
+    current = None  # [periodo, date, close, high, low]
+    for d, close in q:
+        if resample == "daily":
+            yield d, close, close, close
+            continue
+        p = _period_key(d, resample)
+        if current is None or current[0] != p:
+            if current is not None:
+                yield tuple(current[1:])
+            current = [p, d, close, close, close]
+        else:
+            current[1], current[2] = d, close
+            current[3] = max(current[3], close)
+            current[4] = min(current[4], close)
+    if current is not None:
+        yield tuple(current[1:])
+
+# ---------- Lectura (dashboard) ----------
+def _mk_market(sdef: SeriesDef, ultimo: Optional[MercadoUltimo], series, range_code: Optional[str],
+               points: Optional[int]) -> Dict[str, Any]:
+    key = sdef.key
+    dates, closes = series
+    # Cambios, medias y volatilidad miran la cola de la historia completa;
+    # el sparkline y la máxima caída, el rango pedido.
+    ind = analytics.indicators(closes)
+    if range_code:
+        spark_dates, spark = slice_range(series, range_code)
+    else:
+        spark_dates, spark = dates[-SPARK_POINTS:], closes[-SPARK_POINTS:]
+    ind["max_drawdown_pct"] = analytics.max_drawdown(spark)
+    # El tamaño del payload no crece con el rango: LTTB a `points` (cacheado)
+    if points is None and range_code:
+        points = RANGE_POINTS
+    if points is not None:
+        spark_dates, spark = history.downsampled(key, (spark_dates, spark), range_code, points)
+    last_date = str(dates[-1]) if dates.size else None
+
+    return {
+        "id": key,
+        "label": sdef.label,
+        "frequency": sdef.frequency,
+        "value": ultimo.value if ultimo is not None else (float(closes[-1]) if closes.size else None),
+        "unit": sdef.unit,
+        "chg_10d_pct": ind["chg_pct"]["10"],
+        "chg_30d_pct": ind["chg_pct"]["30"],
+        "stale": bool(ultimo.stale) if ultimo is not None else _is_stale(last_date, sdef.stale_days),
+        "last_date": last_date,
+        "range": range_code,
+        "indicators": ind,
+        # el front quiere ASCENDENTE
+        "spark_dates": spark_dates.astype(str).tolist(),
+        "spark": spark.tolist(),
+    }
+
+def norm_range(range_code: Optional[str]) -> Optional[str]:
+    code = (range_code or "").upper() or None
+    return code if code in RANGES else None
+
+def load_dashboard(keys: List[str], range_code: Optional[str] = None,
+                   points: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Construye el payload de /mercados/dashboard.json sin llamar a la EIA:
+    una consulta a mercado_ultimo + el histórico en memoria (markets_history).
+    `range_code` ('1M', '6M', '1Y', '5Y') elige el tramo del sparkline;
+    sin él se devuelven las últimas SPARK_POINTS observaciones. `points`
+    reduce el sparkline con LTTB (por defecto RANGE_POINTS si hay rango).
+    Los indicadores y diferenciales se calculan vectorizados (markets_analytics).
+    """
+    defs = registry()
+    keys = [k for k in keys if k in defs]
+    if not keys:
+        return {"markets": [], "spreads": {}}
+    range_code = norm_range(range_code)
+
+    ultimos = {u.symbol: u for u in MercadoUltimo.query.filter(MercadoUltimo.symbol.in_(keys))}
+    by_symbol = history.load_many(keys)
+
+    spreads: Dict[str, Any] = {}
+    for name, (a, b) in SPREADS.items():
+        if a in by_symbol and b in by_symbol:
+            spreads[name] = analytics.spread(by_symbol[a], by_symbol[b])
+
+    return {
+        "markets": [_mk_market(defs[k], ultimos.get(k), by_symbol[k], range_code, points) for k in keys],
+        "spreads": spreads,
+    }
+
+def dashboard_body(keys: List[str], range_code: Optional[str] = None,
+                   points: Optional[int] = None) -> Tuple[bytes, str]:
+    """
+    (JSON serializado, ETag) del dashboard, servido desde dashboard_cache:
+    se serializa una vez por clave y TTL, no en cada petición.
+    """
+    range_code = norm_range(range_code)
+
+    def _render() -> Tuple[bytes, str]:
+        body = current_app.json.dumps(load_dashboard(keys, range_code, points)).encode("utf-8")
+        return body, hashlib.sha1(body).hexdigest()
+
+    return dashboard_cache.get((tuple(keys), range_code, points), _render)
+
+def write_dashboard_snapshots() -> int:
+    """
+    Escribe en disco (markets_snapshot) el dashboard completo por defecto y por
+    rango, con sus variantes comprimidas. Un fallo de disco no tumba el refresh:
+    mercados_json vuelve entonces a la caché en memoria.
+    """
+    keys = list(registry())
+    try:
+        return write_snapshots(lambda range_code, points: load_dashboard(keys, range_code, points))
+    except Exception:
+        current_app.logger.exception("No se pudieron escribir los snapshots del dashboard")
+        return 0
@@ -64,6 +64,8 @@ class Tag(db.Model):
 # Índices útiles
 Index("ix_tags_slug", Tag.slug, unique=True)
 Index("ix_articulos_slug", Articulos.slug, unique=True)
+# Orden y paginación por cursor de /articulos: (fecha, id) desc
+Index("ix_articulos_fecha_id", Articulos.fecha, Articulos.id)
 
 class Comentarios(db.Model):
     __tablename__ = "comentarios"
@@ -0,0 +1,96 @@
+# app/pagination.py
+"""
+Paginación por keyset (cursor) para listados ordenados de forma descendente.
+
+En lugar de OFFSET, cada página filtra por la clave de orden del último (o
+primer) elemento de la anterior: (fecha, id) < (f, i). Con el índice
+ix_articulos_fecha_id la página 500 cuesta lo mismo que la 1 y no hace falta
+COUNT para saber si hay más (se pide una fila de más).
+
+Los tokens son opacos para el cliente: base64 de JSON con la dirección y los
+valores de la clave.
+"""
+import base64
+import json
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, List, Optional, Sequence, Tuple
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+NEXT = "n"
+PREV = "p"
+
+
+@dataclass
+class KeysetPage:
+    items: List[Any]
+    next_token: Optional[str]   # más antiguos
+    prev_token: Optional[str]   # más recientes
+
+    @property
+    def has_next(self) -> bool:
+        return self.next_token is not None
+
+    @property
+    def has_prev(self) -> bool:
+        return self.prev_token is not None
+
+
+def _dump(v: Any) -> Any:
+    return {"d": v.isoformat()} if isinstance(v, date) else v
+
+def _load(v: Any) -> Any:
+    return date.fromisoformat(v["d"]) if isinstance(v, dict) else v
+
+def encode_token(direction: str, values: Sequence[Any]) -> str:
+    raw = json.dumps([direction, [_dump(v) for v in values]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_token(token: Optional[str], n_values: int) -> Optional[Tuple[str, list]]:
+    """(dirección, valores) o None si el token falta o no es válido (-> primera página)."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        direction, values = json.loads(raw)
+        if direction not in (NEXT, PREV) or len(values) != n_values:
+            return None
+        return direction, [_load(v) for v in values]
+    except (ValueError, TypeError, KeyError):
+        return None
+
+
+def keyset_paginate(q: Query, keys: Sequence, per_page: int, token: Optional[str],
+                    key_of=None) -> KeysetPage:
+    """
+    Página de `q` ordenada por `keys` descendente (la última debe ser única,
+    p. ej. el id). `q` no debe traer order_by. `key_of(item)` devuelve la
+    tupla de valores de la clave de un resultado; por defecto se leen los
+    atributos con el nombre de cada columna.
+    """
+    if key_of is None:
+        names = [k.key for k in keys]
+        key_of = lambda item: tuple(getattr(item, n) for n in names)  # noqa: E731
+    decoded = decode_token(token, len(keys))
+    direction, values = decoded if decoded else (NEXT, None)
+
+    if direction == NEXT:
+        if values is not None:
+            q = q.filter(tuple_(*keys) < tuple_(*values))
+        rows = q.order_by(*[k.desc() for k in keys]).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page]
+        has_next, has_prev = more, values is not None
+    else:
+        q = q.filter(tuple_(*keys) > tuple_(*values))
+        rows = q.order_by(*[k.asc() for k in keys]).limit(per_page + 1).all()
+        more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        has_next, has_prev = True, more
+
+    return KeysetPage(
+        items=rows,
+        next_token=encode_token(NEXT, key_of(rows[-1])) if rows and has_next else None,
+        prev_token=encode_token(PREV, key_of(rows[0])) if rows and has_prev else None,
+    )
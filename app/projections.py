@@ -0,0 +1,77 @@
+# app/projections.py
+"""
+Proyecciones ligeras de Articulos para los listados.
+
+Las tarjetas sólo muestran título, descripción, imagen, fecha, autor y tag,
+así que los listados piden esas columnas (nunca `contenido`, que puede
+ocupar cientos de KB) y las vuelcan en ArticuloCard: dataclass con
+__slots__, inmutable. Los tags de toda la página se cargan con una sola
+consulta adicional.
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy.orm import Query
+from .extensions import db
+from .models import Articulos, Tag, articulo_tags
+
+
+@dataclass(frozen=True, slots=True)
+class TagRef:
+    id: int
+    nombre: str
+    slug: str
+
+
+@dataclass(frozen=True, slots=True)
+class ArticuloCard:
+    id: int
+    titulo: str
+    slug: str
+    descripcion: str
+    img_url: Optional[str]
+    fecha: date
+    autor: str
+    tag: Optional[str]                  # legacy
+    tags: Tuple[TagRef, ...] = ()       # por id
+
+    @property
+    def tag_principal(self) -> Optional[str]:
+        # mismo criterio que Articulos.tag_principal
+        if self.tag:
+            return self.tag
+        return self.tags[0].nombre if self.tags else None
+
+
+# Columnas de una tarjeta, en el orden de ArticuloCard
+CARD_COLUMNS = (Articulos.id, Articulos.titulo, Articulos.slug, Articulos.descripcion,
+                Articulos.img_url, Articulos.fecha, Articulos.autor, Articulos.tag)
+
+
+def card_query(q: Query, *extra) -> Query:
+    """La misma query (filtros, joins, orden) pero seleccionando sólo CARD_COLUMNS (+ extra)."""
+    return q.with_entities(*CARD_COLUMNS, *extra)
+
+def _tags_by_articulo(ids: Iterable[int]) -> Dict[int, Tuple[TagRef, ...]]:
+    ids = list(ids)
+    if not ids:
+        return {}
+    rows = (db.session.query(articulo_tags.c.articulo_id, Tag.id, Tag.nombre, Tag.slug)
+            .join(Tag, Tag.id == articulo_tags.c.tag_id)
+            .filter(articulo_tags.c.articulo_id.in_(ids))
+            .order_by(Tag.id))
+    out: Dict[int, List[TagRef]] = {}
+    for articulo_id, tag_id, nombre, slug in rows:
+        out.setdefault(articulo_id, []).append(TagRef(tag_id, nombre, slug))
+    return {k: tuple(v) for k, v in out.items()}
+
+def to_cards(rows: Iterable[Any]) -> List[ArticuloCard]:
+    """Filas de card_query (columnas extra al final se ignoran) -> ArticuloCard con sus tags."""
+    rows = list(rows)
+    n = len(CARD_COLUMNS)
+    tags = _tags_by_articulo(r[0] for r in rows)
+    return [ArticuloCard(*r[:n], tags=tags.get(r[0], ())) for r in rows]
+
+def cards(q: Query) -> List[ArticuloCard]:
+    """Ejecuta `q` (query de Articulos) como proyección de tarjetas."""
+    return to_cards(card_query(q).all())
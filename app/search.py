@@ -0,0 +1,166 @@
+# app/search.py
+"""
+Búsqueda de texto completo de /articulos sobre el FTS de la propia BD.
+
+- PostgreSQL: columna generada articulos.search_vector (tsvector STORED,
+  configuración 'es_unaccent' = spanish + unaccent) con índice GIN. La crea
+  la migración; se mantiene sola al insertar/editar.
+- SQLite: tabla virtual FTS5 articulos_fts (rowid = articulos.id, tokenizer
+  unicode61 sin diacríticos). La migración la crea y rellena; los CRUD del
+  blog la actualizan con index_articulo()/remove_articulo() en la misma
+  transacción.
+
+Ambas dan un ranking (ts_rank_cd / bm25). Si la BD no tiene el índice (p.
+ej. creada con db.create_all sin migraciones) se vuelve al ILIKE de antes.
+
+Con SEARCH_BACKEND=memory la búsqueda la resuelve app/search_memory.py; los
+CRUD lo actualizan tras el commit con articulo_guardado()/articulo_borrado(),
+para que el fichero persistido nunca recoja cambios que la BD no aceptó.
+"""
+import html
+import re
+from typing import Dict, Optional, Tuple
+from sqlalchemy import func, inspect, literal, literal_column, or_, select, text, union_all
+from sqlalchemy.orm import Query
+from .extensions import db
+from .models import Articulos, Tag, articulo_tags
+from .utils import plain_text
+from . import search_memory
+
+PG_CONFIG = "es_unaccent"
+FTS_TABLE = "articulos_fts"
+# Pesos bm25 por columna de articulos_fts: titulo, descripcion, contenido, tags
+FTS_WEIGHTS = (10.0, 4.0, 1.0, 6.0)
+# Lo que suma al ranking que un tag del artículo coincida (PostgreSQL)
+PG_TAG_BONUS = 0.5
+
+_backend_cache: Dict[str, Optional[str]] = {}
+
+
+def backend() -> Optional[str]:
+    """'postgresql', 'sqlite' o None (sin índice FTS: ILIKE). Se mira una vez por proceso y BD."""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _backend_cache:
+        found = None
+        insp = inspect(engine)
+        if engine.dialect.name == "postgresql":
+            if any(c["name"] == "search_vector" for c in insp.get_columns("articulos")):
+                found = "postgresql"
+        elif engine.dialect.name == "sqlite":
+            if insp.has_table(FTS_TABLE):
+                found = "sqlite"
+        _backend_cache[key] = found
+    return _backend_cache[key]
+
+def reset_backend() -> None:
+    _backend_cache.clear()
+
+
+def texto_indexable(contenido: str) -> str:
+    """HTML de CKEditor -> texto plano (sin etiquetas ni entidades como &eacute;)."""
+    return html.unescape(plain_text(contenido))
+
+def _fts5_query(qtxt: str) -> str:
+    # Cada palabra como frase entre comillas con prefijo: la sintaxis de FTS5
+    # (AND, NEAR, comillas sueltas...) no llega nunca desde el buscador
+    return " ".join(f'"{w}"*' for w in re.findall(r"\w+", qtxt))
+
+
+# --- consulta ---
+def _hits_postgresql(qtxt: str):
+    cfg = literal_column(f"'{PG_CONFIG}'::regconfig")
+    tsq = func.websearch_to_tsquery(cfg, qtxt)
+    vec = literal_column("articulos.search_vector")
+    # UNION en lugar de OR para que la parte de artículos use el índice GIN
+    por_texto = (select(Articulos.id.label("id"), func.ts_rank_cd(vec, tsq).label("rank"))
+                 .where(vec.op("@@")(tsq)))
+    por_tag = (select(articulo_tags.c.articulo_id.label("id"), literal(PG_TAG_BONUS).label("rank"))
+               .join(Tag, Tag.id == articulo_tags.c.tag_id)
+               .where(func.to_tsvector(cfg, Tag.nombre).op("@@")(tsq)))
+    u = union_all(por_texto, por_tag).subquery()
+    return (select(u.c.id, func.sum(u.c.rank).label("rank"))
+            .group_by(u.c.id)
+            .subquery("hits"))
+
+def _hits_sqlite(qtxt: str):
+    match = _fts5_query(qtxt)
+    fts = literal_column(FTS_TABLE)
+    # bm25() es menor cuanto mejor: se invierte para ordenar igual que en PostgreSQL
+    return (select(literal_column("rowid").label("id"),
+                   (-func.bm25(fts, *FTS_WEIGHTS)).label("rank"))
+            .select_from(text(FTS_TABLE))
+            .where(fts.op("MATCH")(match or '""'))
+            .subquery("hits"))
+
+def search_articulos(q: Query, qtxt: str) -> Tuple[Query, list]:
+    """
+    Filtra `q` (una query de Articulos) por `qtxt`. Devuelve (query, claves de
+    orden descendente) para app/pagination.py: (rank, fecha, id) con índice
+    FTS, donde cada fila es (Articulos, rank); (fecha, id) con ILIKE.
+    """
+    kind = backend()
+    if kind is None:
+        like = f"%{qtxt}%"
+        return (q.filter(or_(
+                    Articulos.titulo.ilike(like),
+                    Articulos.descripcion.ilike(like),
+                    Articulos.contenido.ilike(like),
+                    Articulos.tags.any(Tag.nombre.ilike(like)),
+                )),
+                [Articulos.fecha, Articulos.id])
+    hits = _hits_postgresql(qtxt) if kind == "postgresql" else _hits_sqlite(qtxt)
+    q = q.join(hits, hits.c.id == Articulos.id).add_columns(hits.c.rank)
+    return q, [hits.c.rank, Articulos.fecha, Articulos.id]
+
+
+# --- sincronización del FTS5 de SQLite, en la transacción del CRUD (en PostgreSQL la columna es generada) ---
+def index_articulo(a: Articulos) -> None:
+    """(Re)indexa un artículo ya con id (tras flush). No hace commit."""
+    if backend() != "sqlite":
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": a.id})
+    db.session.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, titulo, descripcion, contenido, tags) "
+             "VALUES (:id, :titulo, :descripcion, :contenido, :tags)"),
+        {"id": a.id, "titulo": a.titulo, "descripcion": a.descripcion,
+         "contenido": texto_indexable(a.contenido),
+         "tags": " ".join(t.nombre for t in a.tags)},
+    )
+
+def remove_articulo(articulo_id: int) -> None:
+    if backend() != "sqlite":
+        return
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": articulo_id})
+
+# --- índice en memoria: sólo tras un commit correcto ---
+def articulo_guardado(a: Articulos) -> None:
+    if search_memory.enabled():
+        search_memory.memory_index.upsert(a)
+
+def articulo_borrado(articulo_id: int) -> None:
+    if search_memory.enabled():
+        search_memory.memory_index.remove(articulo_id)
+
+
+def rebuild() -> int:
+    """
+    Reconstruye el índice de SQLite (lo crea si falta, p. ej. en una BD de
+    desarrollo hecha con create_all). Devuelve los artículos indexados; 0 en
+    PostgreSQL, donde no hace falta.
+    """
+    if db.engine.dialect.name != "sqlite":
+        return 0
+    db.session.execute(text(
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+        "titulo, descripcion, contenido, tags, tokenize='unicode61 remove_diacritics 2')"
+    ))
+    db.session.commit()
+    reset_backend()
+    db.session.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    n = 0
+    for a in Articulos.query.order_by(Articulos.id).yield_per(200):
+        index_articulo(a)
+        n += 1
+    db.session.commit()
+    return n
@@ -0,0 +1,240 @@
+# app/search_memory.py
+"""
+Índice invertido en memoria para /articulos, para despliegues cuya BD no
+tiene FTS (SEARCH_BACKEND=memory).
+
+- Indexa titulo, descripcion, nombres de tags y el texto plano de contenido,
+  con acentos plegados ('energia' encuentra 'energía').
+- Ranking BM25 con pesos por campo; paginación por cursor opaco sobre
+  (puntuación, id), estable aunque cambie el índice entre páginas.
+- Los CRUD del blog lo actualizan de forma incremental tras el commit
+  (app/search.py).
+- Se guarda en instance/search/articulos.idx: un reinicio lo carga en vez de
+  reconstruirlo. Cada worker revisa el mtime del fichero antes de usarlo, así
+  que ve los cambios que escribió otro.
+"""
+import base64
+import math
+import os
+import pickle
+import re
+import threading
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from flask import current_app
+from .extensions import db
+from .models import Articulos, Tag, articulo_tags
+
+INDEX_DIR = "search"
+INDEX_FILE = "articulos.idx"
+# Cambiar si cambia el formato o el análisis: fuerza una reconstrucción
+INDEX_VERSION = 1
+
+# Peso de cada campo en la frecuencia de un término (BM25F simplificado)
+FIELD_WEIGHTS = {"titulo": 3.0, "tags": 2.0, "descripcion": 2.0, "contenido": 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+STOPWORDS = frozenset("""
+a al ante con de del desde el en entre es la las le lo los o para por que se sin
+sobre su sus un una unas unos y
+""".split())
+
+Cursor = Tuple[float, int]
+
+
+def fold(s: str) -> str:
+    """Minúsculas y sin diacríticos: 'Energía' -> 'energia'."""
+    s = unicodedata.normalize("NFKD", (s or "").lower())
+    return "".join(ch for ch in s if not unicodedata.combining(ch))
+
+def tokens(s: str) -> List[str]:
+    return [t for t in re.findall(r"\w+", fold(s)) if t not in STOPWORDS]
+
+
+def encode_cursor(c: Cursor) -> str:
+    raw = f"{c[0]!r}:{c[1]}".encode("ascii")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(token: Optional[str]) -> Optional[Cursor]:
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)).decode("ascii")
+        score, doc_id = raw.split(":")
+        return float(score), int(doc_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class MemoryIndex:
+    """Postings {término: {id: tf ponderada}} + términos, longitud y tags por documento."""
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = {}
+        self.doc_terms: Dict[int, Tuple[str, ...]] = {}
+        self.doc_len: Dict[int, float] = {}
+        self.doc_tags: Dict[int, FrozenSet[str]] = {}
+        self.total_len = 0.0
+
+    # --- escritura ---
+    def add(self, doc_id: int, titulo: str, descripcion: str, contenido: str,
+            tags: Iterable[Tuple[str, str]]) -> None:
+        """(Re)indexa un documento. `contenido` ya en texto plano; `tags` = [(nombre, slug)]."""
+        self.remove(doc_id)
+        tags = list(tags)
+        tf: Counter = Counter()
+        length = 0.0
+        for field, text in (("titulo", titulo), ("descripcion", descripcion),
+                            ("tags", " ".join(n for n, _ in tags)), ("contenido", contenido)):
+            w = FIELD_WEIGHTS[field]
+            toks = tokens(text)
+            length += w * len(toks)
+            for t in toks:
+                tf[t] += w
+        for term, freq in tf.items():
+            self.postings.setdefault(term, {})[doc_id] = freq
+        self.doc_terms[doc_id] = tuple(tf)
+        self.doc_len[doc_id] = length
+        self.doc_tags[doc_id] = frozenset(s.lower() for _, s in tags)
+        self.total_len += length
+
+    def remove(self, doc_id: int) -> None:
+        length = self.doc_len.pop(doc_id, None)
+        if length is None:
+            return
+        self.doc_tags.pop(doc_id, None)
+        self.total_len -= length
+        for term in self.doc_terms.pop(doc_id, ()):
+            docs = self.postings.get(term)
+            if docs is not None:
+                docs.pop(doc_id, None)
+                if not docs:
+                    del self.postings[term]
+
+    # --- lectura ---
+    def rank(self, qtxt: str, tag_slug: Optional[str] = None) -> List[Cursor]:
+        """[(puntuación, id)] de mayor a menor relevancia (desempate: id más reciente)."""
+        n = len(self.doc_len)
+        if not n:
+            return []
+        avg = (self.total_len / n) or 1.0
+        scores: Dict[int, float] = {}
+        for term in set(tokens(qtxt)):
+            docs = self.postings.get(term)
+            if not docs:
+                continue
+            idf = math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for doc_id, freq in docs.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len[doc_id] / avg)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * freq * (BM25_K1 + 1) / (freq + norm)
+        if tag_slug:
+            tag_slug = tag_slug.lower()
+            scores = {d: s for d, s in scores.items() if tag_slug in self.doc_tags.get(d, ())}
+        return sorted(((s, d) for d, s in scores.items()), key=lambda x: (-x[0], -x[1]))
+
+    def search(self, qtxt: str, limit: int, cursor: Optional[str] = None,
+               tag_slug: Optional[str] = None) -> Tuple[List[int], Optional[str], int]:
+        """(ids de la página, cursor siguiente o None, total de resultados)."""
+        ranked = self.rank(qtxt, tag_slug)
+        after = decode_cursor(cursor)
+        if after is not None:
+            # (puntuación desc, id desc): seguimos justo detrás del último visto
+            ranked_page = [r for r in ranked if (r[0], r[1]) < after]
+        else:
+            ranked_page = ranked
+        page = ranked_page[:limit]
+        more = len(ranked_page) > limit
+        return [d for _, d in page], (encode_cursor(page[-1]) if more else None), len(ranked)
+
+
+# --- índice del proceso, persistido en disco ---
+def _path() -> str:
+    return os.path.join(current_app.instance_path, INDEX_DIR, INDEX_FILE)
+
+def _docs_from_db() -> Iterable[Tuple[int, str, str, str, List[Tuple[str, str]]]]:
+    from .search import texto_indexable
+    tags: Dict[int, List[Tuple[str, str]]] = {}
+    for articulo_id, nombre, slug in (db.session.query(articulo_tags.c.articulo_id, Tag.nombre, Tag.slug)
+                                      .join(Tag, Tag.id == articulo_tags.c.tag_id)):
+        tags.setdefault(articulo_id, []).append((nombre, slug))
+    rows = (db.session.query(Articulos.id, Articulos.titulo, Articulos.descripcion, Articulos.contenido)
+            .order_by(Articulos.id)
+            .yield_per(200))
+    for articulo_id, titulo, descripcion, contenido in rows:
+        yield articulo_id, titulo, descripcion, texto_indexable(contenido), tags.get(articulo_id, [])
+
+
+class PersistentIndex:
+    """MemoryIndex compartido por el proceso; se recarga si otro worker reescribió el fichero."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index: Optional[MemoryIndex] = None
+        self._mtime_ns: Optional[int] = None
+
+    def _load(self) -> Optional[MemoryIndex]:
+        path = _path()
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+            if self._index is not None and mtime_ns == self._mtime_ns:
+                return self._index
+            with open(path, "rb") as f:
+                version, index = pickle.load(f)
+        except (OSError, EOFError, ValueError, pickle.UnpicklingError):
+            return None
+        if version != INDEX_VERSION or not isinstance(index, MemoryIndex):
+            return None
+        self._index, self._mtime_ns = index, mtime_ns
+        return index
+
+    def _save(self) -> None:
+        path = _path()
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((INDEX_VERSION, self._index), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+        self._mtime_ns = os.stat(path).st_mtime_ns
+
+    def _current(self) -> MemoryIndex:
+        # Con el lock tomado
+        index = self._load()
+        if index is None:
+            index = MemoryIndex()
+            for doc in _docs_from_db():
+                index.add(*doc)
+            self._index = index
+            self._save()
+        return index
+
+    def rebuild(self) -> int:
+        with self._lock:
+            self._index = MemoryIndex()
+            for doc in _docs_from_db():
+                self._index.add(*doc)
+            self._save()
+            return len(self._index.doc_len)
+
+    def search(self, qtxt: str, limit: int, cursor: Optional[str] = None,
+               tag_slug: Optional[str] = None) -> Tuple[List[int], Optional[str], int]:
+        with self._lock:
+            return self._current().search(qtxt, limit, cursor, tag_slug)
+
+    def upsert(self, a: Articulos) -> None:
+        from .search import texto_indexable
+        with self._lock:
+            self._current().add(a.id, a.titulo, a.descripcion, texto_indexable(a.contenido),
+                                [(t.nombre, t.slug) for t in a.tags])
+            self._save()
+
+    def remove(self, articulo_id: int) -> None:
+        with self._lock:
+            self._current().remove(articulo_id)
+            self._save()
+
+
+memory_index = PersistentIndex()
+
+
+def enabled() -> bool:
+    return (current_app.config.get("SEARCH_BACKEND") or "").lower() == "memory"
@@ -0,0 +1,150 @@
+# app/suggest.py
+"""
+Autocompletado del buscador de /articulos (/articulos/suggest?q=).
+
+Array ordenado de claves plegadas (sin acentos, minúsculas) con bisect: una
+consulta es una búsqueda binaria y un recorrido corto, sin tocar la BD.
+Cada título se indexa desde cada inicio de palabra, así que "solar"
+encuentra "Energía solar en Panamá".
+
+Se construye una vez por proceso y los CRUD del blog lo actualizan en el
+worker que escribe. Para recoger lo que escriben los demás workers se
+reconstruye en segundo plano cada REFRESH_SECS, sin bloquear peticiones.
+"""
+import bisect
+import re
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from flask import current_app
+from .extensions import db
+from .models import Articulos, Tag
+from .search_memory import fold
+
+REFRESH_SECS = 300
+MIN_CHARS = 2
+# Tags que se muestran como mucho (van antes que los artículos)
+MAX_TAGS = 3
+# Claves que se recorren como mucho por consulta (muchas palabras repetidas)
+MAX_SCAN = 400
+
+TAG = "tag"
+ARTICULO = "articulo"
+
+# (tipo, slug) -> texto a mostrar
+Items = Dict[Tuple[str, str], str]
+
+
+def _norm(s: str) -> str:
+    return " ".join(re.findall(r"\w+", fold(s)))
+
+def _keys(texto: str) -> List[str]:
+    """Clave desde cada inicio de palabra: 'energia solar', 'solar'."""
+    words = _norm(texto).split()
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (items, claves, valores): claves/valores paralelos y ordenados. Se
+        # sustituye la tupla entera, así que las consultas leen sin lock
+        self._state: Optional[Tuple[Items, List[str], List[Tuple[str, str]]]] = None
+        self._built_at = 0.0
+        self._refreshing = False
+
+    # --- construcción ---
+    def _load(self) -> Items:
+        items: Items = {}
+        for nombre, slug in db.session.query(Tag.nombre, Tag.slug):
+            items[(TAG, slug)] = nombre
+        for titulo, slug in db.session.query(Articulos.titulo, Articulos.slug):
+            items[(ARTICULO, slug)] = titulo
+        return items
+
+    def _publish(self, items: Items) -> None:
+        # Con self._lock tomado
+        pairs = sorted((key, target) for target, texto in items.items() for key in _keys(texto))
+        self._state = (items, [k for k, _ in pairs], [t for _, t in pairs])
+
+    def _refresh_async(self, app) -> None:
+        def run():
+            try:
+                with app.app_context():
+                    items = self._load()
+                    db.session.remove()
+                with self._lock:
+                    self._publish(items)
+                    self._built_at = time.monotonic()
+            except Exception as e:  # se reintenta en la siguiente consulta tras REFRESH_SECS
+                app.logger.warning("suggest: recarga fallida: %s", e)
+                with self._lock:
+                    self._built_at = time.monotonic()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="articulos-suggest", daemon=True).start()
+
+    def _ensure(self) -> None:
+        if self._state is None:
+            with self._lock:
+                if self._state is None:
+                    self._publish(self._load())
+                    self._built_at = time.monotonic()
+            return
+        if not self._refreshing and time.monotonic() - self._built_at > REFRESH_SECS:
+            with self._lock:
+                if self._refreshing:
+                    return
+                self._refreshing = True
+            self._refresh_async(current_app._get_current_object())
+
+    # --- consulta ---
+    def lookup(self, q: str, limit: int = 8) -> List[Tuple[str, str, str]]:
+        """[(tipo, slug, texto)]: primero tags, luego artículos, cada grupo alfabético."""
+        q = _norm(q)
+        if len(q) < MIN_CHARS:
+            return []
+        self._ensure()
+        items, keys, values = self._state
+        seen = set()
+        tags, articulos = [], []
+        i = bisect.bisect_left(keys, q)
+        end = min(len(keys), i + MAX_SCAN)
+        while i < end and keys[i].startswith(q):
+            target = values[i]
+            i += 1
+            if target in seen:
+                continue
+            seen.add(target)
+            group, cap = (tags, MAX_TAGS) if target[0] == TAG else (articulos, limit)
+            if len(group) < cap:
+                group.append(target)
+            if len(tags) >= MAX_TAGS and len(articulos) >= limit:
+                break
+        out = tags + articulos
+        return [(kind, slug, items[(kind, slug)]) for kind, slug in out[:limit]]
+
+    # --- actualizaciones (worker que escribe) ---
+    def _update(self, set_items: Items, drop: Tuple[Tuple[str, str], ...] = ()) -> None:
+        with self._lock:
+            if self._state is None:
+                return  # aún no construido: lo hará la primera consulta con los datos ya guardados
+            items = dict(self._state[0])
+            for target in drop:
+                items.pop(target, None)
+            items.update(set_items)
+            self._publish(items)
+
+    def articulo_guardado(self, a: Articulos, old_slug: Optional[str] = None) -> None:
+        """Tras crear/editar: el título (y el slug si cambió) y sus tags."""
+        drop = ((ARTICULO, old_slug),) if old_slug and old_slug != a.slug else ()
+        set_items: Items = {(ARTICULO, a.slug): a.titulo}
+        set_items.update({(TAG, t.slug): t.nombre for t in a.tags})
+        self._update(set_items, drop)
+
+    def articulo_borrado(self, slug: str) -> None:
+        self._update({}, ((ARTICULO, slug),))
+
+
+suggest_index = SuggestIndex()
@@ -1,8 +1,9 @@
 # app/utils.py
 import re
 from datetime import date, datetime
-from typing import List, Optional
+from typing import Iterable, List, Optional, Tuple
 from slugify import slugify
+from sqlalchemy import delete, func, select
 from .models import Articulos
 
 def generar_slug(titulo: str) -> str:
@@ -52,25 +53,58 @@ def tag_slug(nombre: str) -> str:
 
 
 #Para la API de mercados
-def rolling_insert_30(session, symbol: str, date_str: str, close: float, ModelDaily):
-    exists = session.query(ModelDaily).filter_by(symbol=symbol, date=date_str).first()
-    if exists:
-        return
-    row = ModelDaily(symbol=symbol, date=date_str, close=close)
-    session.add(row)
-    session.flush()
-    rows = (session.query(ModelDaily)
-                  .filter_by(symbol=symbol)
-                  .order_by(ModelDaily.date.asc())
-                  .all())
-    if len(rows) > 30:
-        for r in rows[:len(rows)-30]:
-            session.delete(r)
+def _dialect_insert(session):
+    """insert() con soporte ON CONFLICT según el motor (PostgreSQL o SQLite)."""
+    if session.get_bind().dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert
 
-def pct_change_n(series: list[float], n: int) -> Optional[float]:
-    if len(series) <= n:
-        return None
-    curr = series[-1]; prev = series[-1-n]
-    if prev == 0:
-        return None
-    return (curr - prev) / prev * 100.0
+# Filas por sentencia: 3 parámetros por fila, holgado bajo el límite de SQLite antiguo (999)
+_UPSERT_CHUNK = 300
+
+def bulk_upsert_daily(session, rows: Iterable[Tuple[str, str, float]], ModelDaily,
+                      keep: Optional[int] = None, update: bool = True) -> int:
+    """
+    Inserta un lote de (symbol, 'YYYY-MM-DD', close) con un único
+    INSERT ... ON CONFLICT (symbol, date) por bloque (apoyado en uq_symbol_date).
+    - update=True: si la fecha ya existe, actualiza el cierre (revisiones de la EIA).
+    - update=False: la ignora (DO NOTHING).
+    - keep=N: después, un solo DELETE por conjuntos deja las N fechas más recientes por símbolo.
+    Devuelve cuántas filas nuevas quedaron insertadas: RETURNING id de cada
+    bloque (PostgreSQL, SQLite >= 3.35) contra el id máximo previo (una
+    lectura del índice de la PK), sin contar las filas ya guardadas.
+    """
+    values = [{"symbol": sym, "date": d, "close": float(c)} for (sym, d, c) in rows]
+    if not values:
+        return 0
+    symbols = sorted({v["symbol"] for v in values})
+    table = ModelDaily.__table__
+
+    # Las filas nuevas reciben ids por encima; las actualizadas conservan el suyo
+    max_id = session.execute(select(func.max(table.c.id))).scalar_one() or 0
+    inserted = 0
+    insert = _dialect_insert(session)
+    for i in range(0, len(values), _UPSERT_CHUNK):
+        stmt = insert(table).values(values[i:i + _UPSERT_CHUNK])
+        if update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.symbol, table.c.date],
+                set_={"close": stmt.excluded.close},
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=[table.c.symbol, table.c.date])
+        ids = session.execute(stmt.returning(table.c.id)).scalars()
+        inserted += sum(1 for row_id in ids if row_id > max_id)
+
+    if keep is not None:
+        ranked = (select(table.c.id,
+                         func.row_number().over(partition_by=table.c.symbol,
+                                                order_by=table.c.date.desc()).label("rn"))
+                  .where(table.c.symbol.in_(symbols))
+                  .subquery())
+        session.execute(
+            delete(table).where(table.c.id.in_(select(ranked.c.id).where(ranked.c.rn > keep)))
+        )
+    return inserted
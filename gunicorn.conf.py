@@ -0,0 +1,16 @@
+# gunicorn.conf.py
+"""
+Configuración de gunicorn (la carga el Procfile con -c).
+
+Con el worker gevent, psycopg2 habla con PostgreSQL desde C y no pasa por
+los sockets parcheados: cada consulta bloquearía el bucle de eventos y con
+él todas las conexiones del worker (SSE incluidas). psycogreen instala el
+wait callback de gevent para que psycopg2 ceda mientras espera.
+"""
+
+
+def post_fork(server, worker):
+    if worker.__class__.__module__.startswith("gunicorn.workers.ggevent"):
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+        server.log.info("psycopg2 parcheado para gevent (worker %s)", worker.pid)
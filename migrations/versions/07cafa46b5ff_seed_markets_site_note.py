@@ -0,0 +1,52 @@
+"""seed markets site note
+
+Revision ID: 07cafa46b5ff
+Revises: 2e82c48c5eda
+Create Date: 2026-10-18 03:10:00.000000
+
+"""
+from datetime import datetime, timezone
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '07cafa46b5ff'
+down_revision = '2e82c48c5eda'
+branch_labels = None
+depends_on = None
+
+# Mismo texto que mostraba /mercados cuando la nota aún no existía
+INITIAL_CONTENT = (
+    "Sin comentario aún. (Usa el botón “Nuevo comentario mercados” para publicar el primero.)"
+)
+
+site_notes = sa.table(
+    'site_notes',
+    sa.column('key', sa.String(64)),
+    sa.column('content', sa.Text),
+    sa.column('updated_at', sa.DateTime(timezone=True)),
+)
+
+
+def upgrade():
+    # La fila única key='markets' se crea aquí y no en cada GET de /mercados
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table('site_notes'):
+        return
+    exists = conn.execute(sa.select(site_notes.c.key).where(site_notes.c.key == 'markets')).first()
+    if exists is None:
+        op.bulk_insert(site_notes, [{
+            'key': 'markets',
+            'content': INITIAL_CONTENT,
+            'updated_at': datetime.now(timezone.utc),
+        }])
+
+
+def downgrade():
+    # Sólo quitamos la semilla si nadie la ha editado
+    op.execute(
+        site_notes.delete()
+        .where(site_notes.c.key == 'markets')
+        .where(site_notes.c.content == INITIAL_CONTENT)
+    )
@@ -0,0 +1,84 @@
+"""articulos full text search
+
+Revision ID: c6f6fdc70199
+Revises: 07cafa46b5ff
+Create Date: 2026-10-18 09:20:00.000000
+
+"""
+import html
+import re
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c6f6fdc70199'
+down_revision = '07cafa46b5ff'
+branch_labels = None
+depends_on = None
+
+# Deben coincidir con app/search.py
+PG_CONFIG = 'es_unaccent'
+FTS_TABLE = 'articulos_fts'
+
+# Título (A) > descripción (B) > contenido (D). El parser ignora las etiquetas HTML.
+PG_VECTOR = (
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(titulo, '')), 'A') || "
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(descripcion, '')), 'B') || "
+    f"setweight(to_tsvector('{PG_CONFIG}', coalesce(contenido, '')), 'D')"
+)
+
+
+def _plain(contenido):
+    return html.unescape(re.sub(r"<[^>]+>", "", contenido or ""))
+
+
+def upgrade():
+    conn = op.get_bind()
+    if not sa.inspect(conn).has_table('articulos'):
+        return
+
+    if conn.dialect.name == 'postgresql':
+        op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+        # spanish + unaccent: 'energia' y 'energía' dan el mismo lexema
+        op.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM pg_ts_config WHERE cfgname = '{PG_CONFIG}') THEN
+                    CREATE TEXT SEARCH CONFIGURATION {PG_CONFIG} (COPY = spanish);
+                    ALTER TEXT SEARCH CONFIGURATION {PG_CONFIG}
+                        ALTER MAPPING FOR hword, hword_part, word WITH unaccent, spanish_stem;
+                END IF;
+            END
+            $$;
+        """)
+        op.execute(f"ALTER TABLE articulos ADD COLUMN search_vector tsvector "
+                   f"GENERATED ALWAYS AS ({PG_VECTOR}) STORED")
+        op.create_index('ix_articulos_search_vector', 'articulos', ['search_vector'],
+                        postgresql_using='gin')
+
+    elif conn.dialect.name == 'sqlite':
+        op.execute(f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5("
+                   "titulo, descripcion, contenido, tags, tokenize='unicode61 remove_diacritics 2')")
+        tags = {}
+        for articulo_id, nombre in conn.execute(sa.text(
+                "SELECT at.articulo_id, t.nombre FROM articulo_tags at JOIN tags t ON t.id = at.tag_id")):
+            tags.setdefault(articulo_id, []).append(nombre)
+        rows = conn.execute(sa.text("SELECT id, titulo, descripcion, contenido FROM articulos")).fetchall()
+        for articulo_id, titulo, descripcion, contenido in rows:
+            conn.execute(
+                sa.text(f"INSERT INTO {FTS_TABLE} (rowid, titulo, descripcion, contenido, tags) "
+                        "VALUES (:id, :titulo, :descripcion, :contenido, :tags)"),
+                {"id": articulo_id, "titulo": titulo, "descripcion": descripcion,
+                 "contenido": _plain(contenido), "tags": " ".join(tags.get(articulo_id, []))},
+            )
+
+
+def downgrade():
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_articulos_search_vector")
+        op.execute("ALTER TABLE articulos DROP COLUMN IF EXISTS search_vector")
+        op.execute(f"DROP TEXT SEARCH CONFIGURATION IF EXISTS {PG_CONFIG}")
+    elif conn.dialect.name == 'sqlite':
+        op.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
@@ -0,0 +1,29 @@
+"""articulos (fecha, id) index
+
+Revision ID: ca166804f468
+Revises: c6f6fdc70199
+Create Date: 2026-10-18 10:05:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ca166804f468'
+down_revision = 'c6f6fdc70199'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Paginación por cursor de /articulos: WHERE (fecha, id) < (:f, :i) ORDER BY fecha DESC, id DESC
+    insp = sa.inspect(op.get_bind())
+    if not insp.has_table('articulos'):
+        return
+    if 'ix_articulos_fecha_id' not in {ix['name'] for ix in insp.get_indexes('articulos')}:
+        op.create_index('ix_articulos_fecha_id', 'articulos', ['fecha', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_articulos_fecha_id', table_name='articulos', if_exists=True)
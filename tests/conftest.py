@@ -0,0 +1,59 @@
+# tests/conftest.py
+import os
+import sys
+from datetime import date, timedelta
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _reset_caches():
+    """Las cachés por proceso no deben arrastrar datos de la BD de otro test."""
+    from app.blueprints import blog, main
+    from app.suggest import suggest_index
+    blog._totales.invalidate()
+    main.invalidate_main_tag()
+    suggest_index._state = None
+
+
+@pytest.fixture
+def app(tmp_path):
+    # Config antes de create_app: nunca la BD ni la carpeta instance reales
+    from app.config import Config
+    Config.SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+    Config.MERCADOS_SNAPSHOT_DIR = str(tmp_path / "mercados")
+    Config.SEARCH_BACKEND = ""
+    Config.WTF_CSRF_ENABLED = False
+
+    from app import create_app
+    from app.extensions import db
+    app = create_app()
+    app.config["TESTING"] = True
+    app.instance_path = str(tmp_path / "instance")
+    _reset_caches()
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def articulos(app):
+    """Artículos con el tag "Energía solar" (slug energia-solar) y contenido largo."""
+    from app.extensions import db
+    from app.models import Articulos, Tag
+    solar = Tag(nombre="Energía solar", slug="energia-solar")
+    for i in range(1, 6):
+        a = Articulos(titulo=f"Energía solar {i}", slug=f"solar-{i}", descripcion=f"desc {i}",
+                      contenido="<p>contenido</p>" * 200, autor="Redacción",
+                      fecha=date(2024, 1, 1) + timedelta(days=i))
+        a.tags = [solar]
+        db.session.add(a)
+    db.session.commit()
+    return solar
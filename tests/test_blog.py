@@ -0,0 +1,38 @@
+# tests/test_blog.py
+from jinja2 import ChoiceLoader, DictLoader
+from sqlalchemy import event
+
+
+def test_articulos_por_tag_no_carga_contenido(app, client, articulos):
+    # La plantilla del listado no está en el árbol: una mínima para que la vista responda
+    app.jinja_loader = ChoiceLoader([
+        DictLoader({"articulos_por_tag.html": "{{ tag.nombre }}:{{ articulos|length }}"}),
+        app.jinja_loader,
+    ])
+    from app.extensions import db
+    statements = []
+
+    def _capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _capture)
+    try:
+        resp = client.get("/tags/energia-solar")
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _capture)
+
+    assert resp.status_code == 200
+    assert resp.get_data(as_text=True) == "Energía solar:5"
+    assert statements
+    assert not [s for s in statements if "articulos.contenido" in s]
+
+
+def test_suggest_tag_url_lleva_al_listado(client, articulos):
+    resp = client.get("/articulos/suggest?q=energ")
+    assert resp.status_code == 200
+    tags = [it for it in resp.get_json()["items"] if it["tipo"] == "tag"]
+    assert [t["texto"] for t in tags] == ["Energía solar"]
+
+    listado = client.get(tags[0]["url"])
+    assert listado.status_code == 200
+    assert "Energía solar 1" in listado.get_data(as_text=True)
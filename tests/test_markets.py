@@ -0,0 +1,123 @@
+# tests/test_markets.py
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from app import markets
+
+
+@pytest.fixture
+def eia(app, monkeypatch):
+    """Servidor HTTP local que responde con los códigos de `statuses`, en orden."""
+    calls = []
+    statuses = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(self.path)
+            code = statuses.pop(0) if statuses else 200
+            body = json.dumps({"response": {"data": []}}).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    app.config["EIA_API_ROOT"] = f"http://127.0.0.1:{server.server_port}"
+    monkeypatch.setattr(markets, "EIA_BACKOFF", 0.01)
+    monkeypatch.setattr(markets, "eia_breaker", markets.CircuitBreaker(failure_threshold=2))
+    yield statuses, calls
+    server.shutdown()
+
+
+def test_http_get_no_reintenta_4xx(eia):
+    statuses, calls = eia
+    statuses.extend([403, 403, 403])
+    with pytest.raises(requests.HTTPError):
+        markets._http_get({"api_key": "x"}, deadline=markets.Deadline(10))
+    assert len(calls) == 1
+    snap = markets.eia_breaker.snapshot()
+    assert snap["state"] == "closed" and snap["consecutive_failures"] == 0
+
+
+def test_http_get_reintenta_5xx(eia):
+    statuses, calls = eia
+    statuses.extend([503, 502])
+    assert markets._http_get({"api_key": "x"}, deadline=markets.Deadline(10)) == {"response": {"data": []}}
+    assert len(calls) == 3
+    assert markets.eia_breaker.snapshot()["state"] == "closed"
+
+
+def _fake_chunks(monkeypatch, fail=()):
+    """td_timeseries_chunks sin red: un cierre por tramo, o error en los de `fail`."""
+    from app import markets_store
+    pedidos = []
+
+    def fake(series, ranges, routes=None):
+        pedidos.extend(ranges)
+        return {r: ({"values": {}, "error": "caída"} if r in fail else
+                    {"values": {s: [{"datetime": r[0], "close": 1.0}] for s in series}})
+                for r in ranges}
+
+    monkeypatch.setattr(markets_store, "td_timeseries_chunks", fake)
+    return pedidos
+
+
+def test_backfill_reanuda_otro_dia_con_el_until_guardado(app, monkeypatch):
+    from datetime import date
+    from app import markets_store
+    since = date(2024, 1, 1)
+    job = f"brent|{since.isoformat()}|*|10"
+    # Interrumpido el día 15: el primer tramo ya estaba guardado
+    markets_store._save_progress(job, date(2024, 1, 15), {("2024-01-01", "2024-01-10")})
+    # Otro trabajo no pisa el progreso del anterior
+    markets_store._save_progress("wti|2020-01-01|*|10", date(2020, 2, 1), set())
+
+    pedidos = _fake_chunks(monkeypatch)
+    report = markets_store.backfill_markets(["brent"], since, chunk_days=10)
+
+    assert report["skipped"] == 1 and not report["failed"]
+    assert pedidos == [("2024-01-11", "2024-01-15")]
+    assert markets_store._load_progress(job) is None
+    assert markets_store._load_progress("wti|2020-01-01|*|10")["until"] == date(2020, 2, 1)
+
+
+def test_backfill_incompleto_guarda_until(app, monkeypatch):
+    from datetime import date, timedelta
+    from app import markets_store
+    since = date.today() - timedelta(days=15)
+    fallido = (since.isoformat(), (since + timedelta(days=9)).isoformat())
+    _fake_chunks(monkeypatch, fail={fallido})
+    report = markets_store.backfill_markets(["brent"], since, chunk_days=10)
+
+    assert [f["start"] for f in report["failed"]] == [fallido[0]]
+    saved = markets_store._load_progress(f"brent|{since.isoformat()}|*|10")
+    assert saved["until"] == date.today()
+    assert fallido not in saved["done"] and len(saved["done"]) == 1
+
+
+def test_series_etag_cambia_con_correccion_de_igual_suma(app, client):
+    from app.extensions import db
+    from app.models import MercadoDaily
+    from app.utils import bulk_upsert_daily
+    bulk_upsert_daily(db.session, [("brent", "2024-01-02", 80.0), ("brent", "2024-01-03", 81.0)], MercadoDaily)
+    db.session.commit()
+    etag = client.get("/mercados/series?symbol=brent").headers["ETag"]
+    assert client.get("/mercados/series?symbol=brent", headers={"If-None-Match": etag}).status_code == 304
+
+    # Revisión que intercambia los cierres: misma suma, mismas filas y fechas
+    bulk_upsert_daily(db.session, [("brent", "2024-01-02", 81.0), ("brent", "2024-01-03", 80.0)], MercadoDaily)
+    db.session.commit()
+    resp = client.get("/mercados/series?symbol=brent", headers={"If-None-Match": etag})
+    assert resp.status_code == 200 and resp.headers["ETag"] != etag
+
+
+@pytest.mark.parametrize("qs", ["", "?symbol=", "?symbol=brent,wti"])
+def test_series_symbol_ausente_o_ambiguo_es_400(client, qs):
+    assert client.get(f"/mercados/series{qs}").status_code == 400
@@ -0,0 +1,205 @@
+# tools/bench_markets.py
+"""
+Benchmark de la ingesta y del dashboard de mercados contra el sustituto
+offline de la EIA (tools/eia_standin.py), sin red ni EIA_API_KEY real.
+
+Mide:
+  1. Refresh: backfill en frío e incrementales (filas/s, ms, peticiones a la EIA).
+  2. Latencia peor caso de /mercados/dashboard.json mientras un refresh
+     corre contra una EIA lenta / con errores: con la caché SWR y sin ella
+     (cada petición con un ?points= distinto obliga a recalcular).
+
+Uso:
+  python tools/bench_markets.py
+  python tools/bench_markets.py --slow-ms 3000 --error-rate 0.3 --clients 16 --duration 15
+  python tools/bench_markets.py --fixture tools/fixtures/eia.json --db postgresql://...
+
+Por defecto usa una SQLite temporal; con --db la BD debe tener el esquema (flask db upgrade).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import eia_standin  # noqa: E402
+
+
+def _pct(xs: List[float], q: float) -> float:
+    if not xs:
+        return 0.0
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(round(q * (len(xs) - 1))))]
+
+def _summary(xs: List[float]) -> Dict[str, float]:
+    return {
+        "n": len(xs),
+        "p50_ms": round(_pct(xs, 0.50), 1),
+        "p95_ms": round(_pct(xs, 0.95), 1),
+        "p99_ms": round(_pct(xs, 0.99), 1),
+        "max_ms": round(max(xs), 1) if xs else 0.0,
+        "mean_ms": round(statistics.fmean(xs), 1) if xs else 0.0,
+    }
+
+def _stats(state: "eia_standin.StandinState") -> Dict[str, int]:
+    with state.lock:
+        return dict(state.stats)
+
+def _configure(state: "eia_standin.StandinState", **cfg) -> None:
+    with state.lock:
+        state.config.update(cfg)
+
+
+def bench_refresh(app, state, rounds: int) -> Dict[str, object]:
+    from app.markets_store import refresh_markets
+    from app.markets import eia_breaker
+
+    out: Dict[str, object] = {}
+    with app.app_context():
+        before = _stats(state)
+        t0 = time.perf_counter()
+        report = refresh_markets()
+        secs = time.perf_counter() - t0
+        rows = sum(s.get("rows", 0) for s in report["series"])
+        out["cold"] = {
+            "ok": report["ok"],
+            "rows": rows,
+            "ms": round(secs * 1000, 1),
+            "rows_per_s": round(rows / secs) if secs else None,
+            "eia_requests": _stats(state)["requests"] - before["requests"],
+        }
+
+        times = []
+        before = _stats(state)
+        for _ in range(rounds):
+            t0 = time.perf_counter()
+            refresh_markets()
+            times.append((time.perf_counter() - t0) * 1000)
+        out["incremental"] = {
+            **_summary(times),
+            "eia_requests_per_refresh": round((_stats(state)["requests"] - before["requests"]) / max(1, rounds), 2),
+        }
+        out["breaker"] = eia_breaker.snapshot()
+    return out
+
+
+def bench_dashboard(app, state, clients: int, duration: float, slow_ms: float,
+                    error_rate: float) -> Dict[str, object]:
+    """Clientes golpeando el dashboard mientras otro hilo refresca sin parar contra una EIA lenta."""
+    from app.markets_store import refresh_markets
+
+    _configure(state, latency_ms=slow_ms, error_rate=error_rate)
+    stop = threading.Event()
+    refreshes: List[float] = []
+
+    def _refresher():
+        while not stop.is_set():
+            with app.app_context():
+                t0 = time.perf_counter()
+                refresh_markets()
+                refreshes.append((time.perf_counter() - t0) * 1000)
+
+    def _client(i: int, bust: bool, sink: List[float]):
+        c = app.test_client()
+        n = 0
+        while not stop.is_set():
+            # Con bust cada petición usa un ?points= distinto: la caché no ayuda
+            url = "/mercados/dashboard.json?range=1Y&points="
+            url += str(10 + (i * 997 + n) % 1990) if bust else "200"
+            t0 = time.perf_counter()
+            r = c.get(url)
+            sink.append((time.perf_counter() - t0) * 1000)
+            if r.status_code != 200:
+                raise RuntimeError(f"{url} -> {r.status_code}")
+            n += 1
+
+    results: Dict[str, object] = {}
+    for label, bust in (("cached", False), ("uncached", True)):
+        stop.clear()
+        lat: List[float] = []
+        threads = [threading.Thread(target=_refresher, daemon=True)]
+        threads += [threading.Thread(target=_client, args=(i, bust, lat), daemon=True) for i in range(clients)]
+        for t in threads:
+            t.start()
+        time.sleep(duration)
+        stop.set()
+        for t in threads:
+            t.join()
+        results[label] = _summary(lat)
+    results["refresh_under_slowness"] = _summary(refreshes)
+    _configure(state, latency_ms=0, error_rate=0)
+    return results
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark de mercados contra el sustituto offline de la EIA")
+    ap.add_argument("--fixture", help="fixture de tools/eia_standin.py (por defecto, datos sintéticos)")
+    ap.add_argument("--db", help="URL de BD (por defecto SQLite temporal con create_all)")
+    ap.add_argument("--rounds", type=int, default=10, help="refreshes incrementales a medir")
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10, help="segundos por escenario del dashboard")
+    ap.add_argument("--latency-ms", type=float, default=0, help="latencia base de la EIA en la fase de refresh")
+    ap.add_argument("--slow-ms", type=float, default=2000, help="latencia de la EIA durante la fase del dashboard")
+    ap.add_argument("--error-rate", type=float, default=0.2, help="errores inyectados durante la fase del dashboard")
+    ap.add_argument("--json", action="store_true", help="salida JSON")
+    args = ap.parse_args(argv)
+
+    data = eia_standin.load_fixture(args.fixture) if args.fixture else eia_standin.synthetic(eia_standin.DEFAULT_SERIES)
+    state = eia_standin.StandinState(data, latency_ms=args.latency_ms, seed=1)
+    server = eia_standin.serve(state, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    # Config antes de create_app: .env no debe apuntar el benchmark a la BD/EIA reales
+    from app.config import Config
+    # Temporal también con --db: los snapshots sintéticos no van a instance/mercados
+    tmpdir = tempfile.mkdtemp(prefix="bench_markets_")
+    Config.MERCADOS_SNAPSHOT_DIR = os.path.join(tmpdir, "mercados")
+    Config.SQLALCHEMY_DATABASE_URI = args.db or f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+    Config.EIA_API_ROOT = f"http://127.0.0.1:{server.server_port}"
+    Config.EIA_API_KEY = "bench"
+
+    from app import create_app
+    from app.extensions import db
+    app = create_app()
+    app.logger.disabled = True
+    if not args.db:
+        with app.app_context():
+            db.create_all()
+
+    results = {
+        "refresh": bench_refresh(app, state, args.rounds),
+        "dashboard": bench_dashboard(app, state, args.clients, args.duration, args.slow_ms, args.error_rate),
+        "standin": _stats(state),
+    }
+    server.shutdown()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    r = results["refresh"]
+    print(f"Refresh en frío: {r['cold']['rows']} filas en {r['cold']['ms']} ms "
+          f"({r['cold']['rows_per_s']} filas/s, {r['cold']['eia_requests']} peticiones EIA)")
+    inc = r["incremental"]
+    print(f"Refresh incremental x{inc['n']}: p50 {inc['p50_ms']} ms, max {inc['max_ms']} ms, "
+          f"{inc['eia_requests_per_refresh']} peticiones EIA/refresh")
+    d = results["dashboard"]
+    print(f"Dashboard con EIA a {args.slow_ms:.0f} ms y {args.error_rate:.0%} de errores, {args.clients} clientes:")
+    for label in ("cached", "uncached"):
+        s = d[label]
+        print(f"  {label:9s} n={s['n']:6d}  p50 {s['p50_ms']} ms  p95 {s['p95_ms']} ms  "
+              f"p99 {s['p99_ms']} ms  max {s['max_ms']} ms")
+    s = d["refresh_under_slowness"]
+    print(f"  refresh concurrente: n={s['n']}  p50 {s['p50_ms']} ms  max {s['max_ms']} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
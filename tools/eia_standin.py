@@ -0,0 +1,321 @@
+# tools/eia_standin.py
+"""
+Sustituto local de la API v2 de la EIA para probar y medir mercados sin red.
+
+Sirve GET /v2/<ruta>/data/ (p. ej. /v2/petroleum/pri/spt/data/) desde un
+fixture grabado, con los dos estilos que usa app/markets.py:
+  - header X-Params (JSON con frequency, data, facets, sort, start, end, offset, length)
+  - querystring (facets[series][]=..., sort[0][direction]=..., offset, length, start, end)
+Pagina igual que la EIA (length máx. 5000, `total` con el número de filas
+que cumplen el filtro) y permite inyectar latencia y errores.
+
+Uso:
+  python tools/eia_standin.py --record tools/fixtures/eia.json   # graba de la EIA real (EIA_API_KEY)
+  python tools/eia_standin.py --fixture tools/fixtures/eia.json --port 8765 --latency-ms 200 --error-rate 0.1
+  EIA_API_ROOT=http://127.0.0.1:8765 flask markets refresh
+
+Sin --fixture se generan series sintéticas deterministas (las de DEFAULT_SERIES).
+
+Control en caliente (lo usa tools/bench_markets.py):
+  POST /_standin/config  {"latency_ms": 2000, "error_rate": 0.2, ...}
+  GET  /_standin/stats   peticiones, errores inyectados y filas servidas
+"""
+import argparse
+import bisect
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+MAX_LENGTH = 5000
+# Series que graba --record por defecto: {ruta: [series]}
+DEFAULT_SERIES = {
+    "petroleum/pri/spt": ["RBRTE", "RWTC", "EER_EPD2F_PF4_Y35NY_DPG", "EER_EPMRU_PF4_Y35NY_DPG"],
+    "natural-gas/pri/fut": ["RNGWHHD"],
+}
+UNITS = {"petroleum/pri/spt": "$/BBL", "natural-gas/pri/fut": "$/MMBTU"}
+
+Rows = List[Tuple[str, str]]  # [(periodo, valor)] ascendente
+
+
+# ---------- Datos ----------
+def synthetic(series: Dict[str, List[str]], years: int = 40, seed: int = 7) -> Dict[str, Dict[str, Rows]]:
+    """Paseo aleatorio diario (días laborables) por serie; mismo seed = mismos datos."""
+    rng = random.Random(seed)
+    end = date.today() - timedelta(days=1)
+    start = end - timedelta(days=365 * years)
+    out: Dict[str, Dict[str, Rows]] = {}
+    for route, keys in series.items():
+        out[route] = {}
+        for key in keys:
+            price, rows, d = 20.0 + rng.random() * 10, [], start
+            while d <= end:
+                if d.weekday() < 5:
+                    price = max(1.0, price * (1 + rng.gauss(0.0002, 0.02)))
+                    rows.append((d.isoformat(), f"{price:.2f}"))
+                d += timedelta(days=1)
+            out[route][key] = rows
+    return out
+
+def load_fixture(path: str) -> Dict[str, Dict[str, Rows]]:
+    """{ruta: {serie: [[periodo, valor], ...]}} -> mismas series, ordenadas ascendente."""
+    with open(path, encoding="utf-8") as f:
+        raw = json.load(f)
+    return {route: {key.upper(): sorted((str(p)[:10], str(v)) for p, v in rows)
+                    for key, rows in series.items()}
+            for route, series in raw.items()}
+
+def record(path: str, series: Dict[str, List[str]], api_key: str, root: str = "https://api.eia.gov") -> None:
+    """Descarga la historia completa de cada serie (páginas de 5000) y la guarda como fixture."""
+    import requests
+
+    out: Dict[str, Dict[str, list]] = {}
+    for route, keys in series.items():
+        out[route] = {}
+        for key in keys:
+            rows, offset = [], 0
+            while True:
+                xparams = {"frequency": "daily", "data": ["value"], "facets": {"series": [key]},
+                           "sort": [{"column": "period", "direction": "asc"}],
+                           "offset": offset, "length": MAX_LENGTH}
+                r = requests.get(f"{root}/v2/{route}/data/", params={"api_key": api_key},
+                                 headers={"X-Params": json.dumps(xparams)}, timeout=(5, 60))
+                r.raise_for_status()
+                page = (r.json().get("response") or {}).get("data") or []
+                rows += [[row["period"], row["value"]] for row in page if row.get("value") is not None]
+                if len(page) < MAX_LENGTH:
+                    break
+                offset += len(page)
+            out[route][key] = rows
+            print(f"{route} {key}: {len(rows)} filas")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(out, f)
+
+
+# ---------- Servidor ----------
+class StandinState:
+    """Datos + parámetros de inyección + contadores, compartidos por los hilos del servidor."""
+    def __init__(self, data: Dict[str, Dict[str, Rows]], latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0, error_status: int = 503, retry_after: Optional[int] = None,
+                 seed: Optional[int] = None):
+        self.data = data
+        # Periodos en lista aparte para cortar `start`/`end` con bisect
+        self.periods = {route: {k: [p for p, _ in rows] for k, rows in series.items()}
+                        for route, series in data.items()}
+        self.lock = threading.Lock()
+        self.rng = random.Random(seed)
+        self.config = {
+            "latency_ms": latency_ms,
+            "jitter_ms": jitter_ms,
+            "error_rate": error_rate,
+            "error_status": error_status,
+            "retry_after": retry_after,
+        }
+        self.stats = {"requests": 0, "xparams": 0, "querystring": 0, "errors_injected": 0, "rows": 0}
+
+    def count(self, **inc: int) -> None:
+        with self.lock:
+            for k, v in inc.items():
+                self.stats[k] += v
+
+    def inject(self) -> Optional[int]:
+        """Duerme la latencia configurada; devuelve un status de error si toca fallar."""
+        with self.lock:
+            cfg = dict(self.config)
+            delay = cfg["latency_ms"] + self.rng.uniform(0, cfg["jitter_ms"])
+            fail = self.rng.random() < cfg["error_rate"]
+        if delay > 0:
+            time.sleep(delay / 1000.0)
+        return cfg["error_status"] if fail else None
+
+    def query(self, route: str, keys: List[str], start: Optional[str], end: Optional[str],
+              desc: bool, offset: int, length: int) -> Tuple[int, List[Dict[str, Any]]]:
+        """(total, página) de las filas de `keys` en [start, end], ordenadas por periodo."""
+        series = self.data.get(route, {})
+        slices = []
+        for key in keys:
+            rows = series.get(key)
+            if not rows:
+                continue
+            periods = self.periods[route][key]
+            i = bisect.bisect_left(periods, start) if start else 0
+            j = bisect.bisect_right(periods, end) if end else len(rows)
+            part = [(p, key, v) for p, v in rows[i:j]]
+            slices.append(part[::-1] if desc else part)
+        total = sum(len(s) for s in slices)
+        merged = heapq.merge(*slices, key=lambda r: (r[0], r[1]), reverse=desc)
+        page = []
+        for n, (p, key, v) in enumerate(merged):
+            if n < offset:
+                continue
+            if len(page) >= length:
+                break
+            page.append({"period": p, "series": key, "value": v, "units": UNITS.get(route, "")})
+        return total, page
+
+
+def _params(handler: BaseHTTPRequestHandler, qs: Dict[str, List[str]]) -> Dict[str, Any]:
+    """Parámetros normalizados desde X-Params (si viene) o desde la querystring."""
+    raw = handler.headers.get("X-Params")
+    if raw:
+        x = json.loads(raw)
+        sort = (x.get("sort") or [{}])[0]
+        return {
+            "style": "xparams",
+            "frequency": x.get("frequency"),
+            "series": list((x.get("facets") or {}).get("series") or []),
+            "start": x.get("start"), "end": x.get("end"),
+            "desc": str(sort.get("direction", "asc")).lower() == "desc",
+            "offset": x.get("offset", 0), "length": x.get("length", MAX_LENGTH),
+        }
+    one = lambda k, d=None: (qs.get(k) or [d])[0]
+    return {
+        "style": "querystring",
+        "frequency": one("frequency"),
+        "series": qs.get("facets[series][]") or [],
+        "start": one("start"), "end": one("end"),
+        "desc": str(one("sort[0][direction]", "asc")).lower() == "desc",
+        "offset": one("offset", 0), "length": one("length", MAX_LENGTH),
+    }
+
+
+def make_handler(state: StandinState):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, como la EIA real
+
+        def log_message(self, fmt, *args):  # silencioso: los benchmarks hacen muchas peticiones
+            pass
+
+        def _json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> None:
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/_standin/stats":
+                with state.lock:
+                    return self._json(200, {"stats": dict(state.stats), "config": dict(state.config)})
+            parts = url.path.strip("/").split("/")
+            if len(parts) < 3 or parts[0] != "v2" or parts[-1] != "data":
+                return self._json(404, {"error": "Not found"})
+            route = "/".join(parts[1:-1])
+            if route not in state.data:
+                return self._json(404, {"error": f"Invalid route: {route}", "code": 404})
+
+            qs = parse_qs(url.query)
+            if not (qs.get("api_key") or [""])[0]:
+                return self._json(403, {"error": {"code": "API_KEY_MISSING",
+                                                  "message": "No api_key was supplied."}})
+            try:
+                p = _params(self, qs)
+                offset, length = max(0, int(p["offset"])), max(1, int(p["length"]))
+            except (ValueError, TypeError) as e:
+                return self._json(400, {"error": f"Invalid parameters: {e}", "code": 400})
+            state.count(requests=1, **{p["style"]: 1})
+
+            status = state.inject()
+            if status is not None:
+                state.count(errors_injected=1)
+                retry_after = state.config.get("retry_after")
+                return self._json(status, {"error": "injected", "code": status},
+                                  {"Retry-After": str(retry_after)} if retry_after else None)
+
+            keys = [str(k).upper() for k in p["series"]]
+            if p["frequency"] not in (None, "daily"):
+                total, page = 0, []
+            else:
+                total, page = state.query(route, keys, p["start"], p["end"], p["desc"],
+                                          offset, min(length, MAX_LENGTH))
+            state.count(rows=len(page))
+            body = {
+                "response": {
+                    "total": str(total),
+                    "dateFormat": "YYYY-MM-DD",
+                    "frequency": "daily",
+                    "data": page,
+                },
+                "request": {"command": f"/v2/{route}/data/",
+                            "params": {"facets": {"series": keys}, "offset": offset, "length": length}},
+                "apiVersion": "2.1.8",
+            }
+            if length > MAX_LENGTH:
+                body["warning"] = f"The API can only return {MAX_LENGTH} rows in JSON format."
+            self._json(200, body)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/_standin/config":
+                return self._json(404, {"error": "Not found"})
+            n = int(self.headers.get("Content-Length") or 0)
+            try:
+                changes = json.loads(self.rfile.read(n) or b"{}")
+            except ValueError:
+                return self._json(400, {"error": "JSON inválido"})
+            with state.lock:
+                unknown = set(changes) - set(state.config)
+                if unknown:
+                    return self._json(400, {"error": f"claves desconocidas: {sorted(unknown)}"})
+                state.config.update(changes)
+                return self._json(200, {"config": dict(state.config)})
+
+    return Handler
+
+
+def serve(state: StandinState, host: str = "127.0.0.1", port: int = 8765) -> ThreadingHTTPServer:
+    """Crea el servidor (port=0: puerto libre); el llamador decide si serve_forever en un hilo."""
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    return server
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Sustituto offline de la API v2 de la EIA")
+    ap.add_argument("--fixture", help="JSON {ruta: {serie: [[periodo, valor], ...]}}; sin él, datos sintéticos")
+    ap.add_argument("--record", metavar="PATH", help="graba un fixture desde la EIA real y sale")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--latency-ms", type=float, default=0)
+    ap.add_argument("--jitter-ms", type=float, default=0)
+    ap.add_argument("--error-rate", type=float, default=0, help="fracción de peticiones que fallan (0-1)")
+    ap.add_argument("--error-status", type=int, default=503)
+    ap.add_argument("--retry-after", type=int, default=None, help="segundos en Retry-After de los errores")
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args(argv)
+
+    if args.record:
+        api_key = os.getenv("EIA_API_KEY", "").strip()
+        if not api_key:
+            print("Falta EIA_API_KEY para grabar", file=sys.stderr)
+            return 2
+        record(args.record, DEFAULT_SERIES, api_key)
+        return 0
+
+    data = load_fixture(args.fixture) if args.fixture else synthetic(DEFAULT_SERIES)
+    state = StandinState(data, args.latency_ms, args.jitter_ms, args.error_rate,
+                         args.error_status, args.retry_after, args.seed)
+    server = serve(state, args.host, args.port)
+    n = sum(len(rows) for series in data.values() for rows in series.values())
+    print(f"EIA stand-in en http://{args.host}:{server.server_port} ({n} filas); "
+          f"EIA_API_ROOT=http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())